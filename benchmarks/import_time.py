@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Library Import Time Benchmark
+---------------------------------
+
+Measures the wall clock time taken by a fresh interpreter to run
+``import tendril.libraries.edasymbols``, with the EDA library modules
+loaded eagerly and lazily, and the time taken by the first symbol lookup
+when they are loaded lazily.
+
+The libraries used are those of the instance configuration in effect.
+
+Usage::
+
+    python benchmarks/import_time.py [runs]
+
+"""
+
+import os
+import sys
+import subprocess
+from statistics import median
+
+
+IMPORT_ONLY = "import tendril.libraries.edasymbols"
+FIRST_USE = ("import tendril.libraries.edasymbols as m; "
+             "m.is_recognized('')")
+
+
+def timed_run(statement, lazy):
+    env = dict(os.environ)
+    env.pop('TENDRIL_EDA_LIBRARY_LAZY', None)
+    if lazy:
+        env['TENDRIL_EDA_LIBRARY_LAZY'] = '1'
+    script = ("import time; _t = time.time(); {0}; "
+              "print(time.time() - _t)".format(statement))
+    output = subprocess.check_output([sys.executable, '-c', script],
+                                     env=env, stderr=subprocess.DEVNULL)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def main(runs=5):
+    cases = [
+        ('import, eager', IMPORT_ONLY, False),
+        ('import, lazy', IMPORT_ONLY, True),
+        ('import and first lookup, lazy', FIRST_USE, True),
+    ]
+    for name, statement, lazy in cases:
+        times = [timed_run(statement, lazy) for _ in range(runs)]
+        print("{0:32} median {1:8.3f}s  min {2:8.3f}s"
+              "".format(name, median(times), min(times)))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:2]])
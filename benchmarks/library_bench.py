@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Symbol Library Benchmark
+----------------------------
+
+Measures the time taken by the common operations on EDA symbol libraries,
+using synthetic libraries of the given sizes written by
+:mod:`synthlib`. For each size, the following are measured:
+
+    - ``load`` : Loading the library, with empty caches.
+    - ``load_warm`` : Loading the library again, with the parse cache
+      populated by a previous load.
+    - ``index`` : Building the library's index.
+    - ``fused_index`` : Building the fused index of the library and a
+      second library a tenth its size.
+    - ``lookup`` : Looking up idents in the library, a tenth of which are
+      not present.
+    - ``fused_lookup`` : Looking up the same idents in the fused index.
+    - ``jellybean_cold`` : Finding resistors and capacitors by value,
+      starting with no jellybean partitions.
+    - ``jellybean`` : Finding the same resistors and capacitors again.
+    - ``harmonize`` : Harmonizing the lines of a synthetic BOM.
+    - ``generator_expansion`` : Parsing the library's generator files and
+      expanding them into symbols.
+    - ``regenerate_noop`` : Incrementally regenerating the unchanged
+      library.
+    - ``audit_export`` : Writing out the audit of the library.
+    - ``audit_export_unchanged`` : Exporting the unchanged audit again.
+
+Each measurement is repeated, and the individual samples are written out
+as JSON, along with a description of the environment, for use by
+:mod:`regression_gate`.
+
+The libraries are written to a temporary folder unless one is given, in
+which case existing libraries there are reused. The instance's EDA
+libraries are not loaded.
+
+Usage::
+
+    python benchmarks/library_bench.py [-r REPEAT] [-o OUTPUT]
+                                       [-d FOLDER] [SIZE ...]
+
+"""
+
+import os
+# The instance's own EDA libraries are never needed here.
+os.environ.setdefault('TENDRIL_EDA_LIBRARY_LAZY', '1')
+
+import sys                          # noqa
+import json                         # noqa
+import time                         # noqa
+import random                       # noqa
+import shutil                       # noqa
+import platform                     # noqa
+import argparse                     # noqa
+import tempfile                     # noqa
+import datetime                     # noqa
+import importlib                    # noqa
+from statistics import median       # noqa
+
+from tendril.entities.edasymbols.cache import EDASymbolParseCache  # noqa
+from tendril.entities.edasymbols.cache import get_parse_cache      # noqa
+from tendril.entities.edasymbols.cache import set_parse_cache      # noqa
+from tendril.entities.edasymbols.cache import get_generator_cache  # noqa
+from tendril.libraries.edasymbols.manager import EDALibraryManager  # noqa
+
+from synthlib import BenchSymbolLibrary     # noqa
+from synthlib import generate_library       # noqa
+
+# These are imported by name, since an attribute lookup on the library
+# manager which stands in for the package would load the libraries.
+PACKAGE = 'tendril.libraries.edasymbols'
+library_base = importlib.import_module(PACKAGE + '.base')
+jellybean = importlib.import_module(PACKAGE + '.jellybean')
+
+
+DEFAULT_SIZES = [1000, 10000]
+NLOOKUPS = 2000
+NJELLYBEANS = 500
+NBOMLINES = 1000
+
+
+class BOMLine(object):
+    def __init__(self, device, value, footprint):
+        self.data = {'device': device, 'value': value,
+                     'footprint': footprint}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    rval = func(*args, **kwargs)
+    return time.perf_counter() - start, rval
+
+
+def get_library(folder, nsymbols, seed):
+    path = os.path.join(folder, 'synth-{0}-{1}'.format(nsymbols, seed))
+    if not os.path.exists(path):
+        generate_library(path, nsymbols, seed=seed)
+    return path
+
+
+def load_library(path, cache=None):
+    if cache is None:
+        cache = EDASymbolParseCache()
+        get_generator_cache().clear()
+    set_parse_cache(cache)
+    return timed(BenchSymbolLibrary, path, workers=0)
+
+
+def build_manager(library, extra):
+    # The library manager which stands in for the package is used with
+    # just the synthetic libraries installed, and is never loaded.
+    manager = sys.modules[PACKAGE]
+    manager_module = sys.modules[EDALibraryManager.__module__]
+    manager_module.EDA_LIBRARY_FUSION = True
+    manager_module.EDA_LIBRARY_PRIORITY = ['bench', 'bench_extra']
+    library_base.load(manager)
+    manager.install_library('bench', library)
+    manager.install_library('bench_extra', extra)
+    manager._loaded = True
+    return manager
+
+
+def sample_queries(library, rng):
+    idents = sorted(library.index.keys())
+    lookups = [rng.choice(idents) for _ in range(NLOOKUPS)]
+    for idx in range(0, NLOOKUPS, 10):
+        lookups[idx] = 'MISSING {0}'.format(idx)
+
+    jellybeans = [x for x in library.symbols
+                  if x.device in ('RES SMD', 'CAP CER SMD') and x.value]
+    queries = []
+    for symbol in rng.sample(jellybeans, min(NJELLYBEANS, len(jellybeans))):
+        value = symbol.value.split('/')[0]
+        if symbol.device == 'RES SMD':
+            queries.append(('find_resistor', symbol.device,
+                            symbol.footprint, value))
+        else:
+            queries.append(('find_capacitor', symbol.device,
+                            symbol.footprint, value))
+
+    bomlines = [(x.device, x.value, x.footprint)
+                for x in rng.sample(library.symbols,
+                                    min(NBOMLINES, len(library.symbols)))]
+    return lookups, queries, bomlines
+
+
+def run_lookups(target, lookups):
+    for ident in lookups:
+        try:
+            target.get_symbol(ident)
+        except library_base.EDASymbolNotFound:
+            pass
+
+
+def run_jellybeans(manager, queries):
+    for finder, device, footprint, value in queries:
+        try:
+            getattr(manager, finder)(device, footprint, value)
+        except library_base.EDASymbolNotFound:
+            pass
+
+
+def reset_jellybeans(manager):
+    manager._jb_index = {}
+    for library in manager._libraries.values():
+        library._jb_partitions = {}
+
+
+def run_generator_expansion(library):
+    get_generator_cache().clear()
+    for generator in library.generators:
+        library._get_file_symbols(generator.fpath)
+
+
+def run_audit_export(library, audit_path, unchanged):
+    if not unchanged:
+        for fname in os.listdir(audit_path):
+            os.remove(os.path.join(audit_path, fname))
+    return timed(library.export_audit, 'bench')[0]
+
+
+def bench_size(folder, nsymbols, repeat, seed):
+    rng = random.Random(seed)
+    samples = {}
+
+    def record(metric, value):
+        samples.setdefault(metric, []).append(value)
+
+    path = get_library(folder, nsymbols, seed)
+    extra_path = get_library(folder, max(nsymbols // 10, 100), seed + 1)
+    audit_path = tempfile.mkdtemp(prefix='tendril-audit-')
+    library_base.AUDIT_PATH = audit_path
+
+    try:
+        for _ in range(repeat):
+            elapsed, library = load_library(path)
+            record('load', elapsed)
+            record('load_warm',
+                   load_library(path, cache=get_parse_cache())[0])
+
+        _, extra = load_library(extra_path)
+        manager = build_manager(library, extra)
+        lookups, queries, bomlines = sample_queries(library, rng)
+
+        for _ in range(repeat):
+            record('index', timed(library._generate_index)[0])
+            record('fused_index', timed(manager._generate_index)[0])
+            record('lookup', timed(run_lookups, library, lookups)[0])
+            record('fused_lookup', timed(run_lookups, manager, lookups)[0])
+            reset_jellybeans(manager)
+            record('jellybean_cold',
+                   timed(run_jellybeans, manager, queries)[0])
+            record('jellybean', timed(run_jellybeans, manager, queries)[0])
+            items = [BOMLine(*x) for x in bomlines]
+            record('harmonize', timed(manager.jb_harmonize_many, items)[0])
+            record('generator_expansion',
+                   timed(run_generator_expansion, library)[0])
+            record('regenerate_noop',
+                   timed(library.regenerate, incremental=True)[0])
+            record('audit_export',
+                   run_audit_export(library, audit_path, False))
+            record('audit_export_unchanged',
+                   run_audit_export(library, audit_path, True))
+    finally:
+        shutil.rmtree(audit_path, ignore_errors=True)
+
+    return {
+        'symbols': len(library.symbols),
+        'files': len(library._file_order),
+        'generators': len(library.generators),
+        'metrics': samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark EDA symbol libraries on synthetic libraries."
+    )
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES,
+                        help="Number of symbols in each synthetic library")
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help="Number of samples of each measurement")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-d', '--folder', default=None,
+                        help="Folder to keep the synthetic libraries in")
+    parser.add_argument('-o', '--output', default=None,
+                        help="File to write the results to, as JSON")
+    args = parser.parse_args()
+
+    folder = args.folder or tempfile.mkdtemp(prefix='tendril-synthlib-')
+    results = {
+        'meta': {
+            'created': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'numpy': jellybean.numpy is not None,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    try:
+        for nsymbols in args.sizes:
+            result = bench_size(folder, nsymbols, args.repeat, args.seed)
+            results['results'][str(nsymbols)] = result
+            print("{0} symbols ({1} files, {2} generators)"
+                  "".format(result['symbols'], result['files'],
+                            result['generators']))
+            for metric, values in result['metrics'].items():
+                print("    {0:24} median {1:9.4f}s  min {2:9.4f}s"
+                      "".format(metric, median(values), min(values)))
+    finally:
+        if args.folder is None:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
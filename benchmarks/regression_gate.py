@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Symbol Library Benchmark Regression Gate
+--------------------------------------------
+
+Compares the results of a run of :mod:`library_bench` against a baseline
+run, and exits with a non-zero status if any measurement has
+significantly regressed.
+
+Each measurement is compared by the ratio of the median of its samples to
+the median of the baseline samples. A confidence interval for that ratio
+is estimated by bootstrap resampling of both sets of samples. A
+measurement has regressed only if the whole interval lies above
+``1 + threshold``, so that slowdowns within the noise of the samples do
+not fail the gate. Improvements are reported in the same way, but never
+fail it.
+
+The committed baseline, ``benchmarks/baseline.json``, is only meaningful
+on the machine it was recorded on. To check a change locally, record a
+baseline before making it::
+
+    python benchmarks/library_bench.py -o /tmp/baseline.json
+    python benchmarks/library_bench.py -o /tmp/results.json
+    python benchmarks/regression_gate.py /tmp/results.json \
+        -b /tmp/baseline.json
+
+Usage::
+
+    python benchmarks/regression_gate.py RESULTS [-b BASELINE]
+                                         [-t THRESHOLD] [-c CONFIDENCE]
+                                         [-m METRIC ...]
+
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from statistics import median
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'baseline.json')
+
+REGRESSED = 'REGRESSED'
+IMPROVED = 'improved'
+UNCHANGED = 'ok'
+
+
+def bootstrap_ratio(samples, baseline, confidence, resamples, rng):
+    """
+    Return the ratio of the median of ``samples`` to the median of
+    ``baseline``, and the bounds of its ``confidence`` interval as
+    estimated from ``resamples`` bootstrap resamples of each.
+    """
+    ratio = median(samples) / median(baseline)
+    ratios = []
+    for _ in range(resamples):
+        rsamples = [rng.choice(samples) for _ in samples]
+        rbaseline = [rng.choice(baseline) for _ in baseline]
+        ratios.append(median(rsamples) / median(rbaseline))
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    lo = ratios[int(tail * (resamples - 1))]
+    hi = ratios[int((1 - tail) * (resamples - 1))]
+    return ratio, lo, hi
+
+
+def compare(results, baseline, threshold=0.1, confidence=0.95,
+            resamples=2000, metrics=None, seed=0):
+    """
+    Compare the ``results`` of a benchmark run against a ``baseline``
+    run. Returns a list of ``(size, metric, ratio, lo, hi, verdict)``
+    tuples, one for each measurement present in both.
+    """
+    rng = random.Random(seed)
+    rval = []
+    for size, bresult in sorted(baseline['results'].items(),
+                                key=lambda x: int(x[0])):
+        result = results['results'].get(size)
+        if result is None:
+            continue
+        for metric, bsamples in sorted(bresult['metrics'].items()):
+            if metrics and metric not in metrics:
+                continue
+            samples = result['metrics'].get(metric)
+            if not samples or not bsamples or min(bsamples) <= 0:
+                continue
+            ratio, lo, hi = bootstrap_ratio(samples, bsamples,
+                                            confidence, resamples, rng)
+            if lo > 1 + threshold:
+                verdict = REGRESSED
+            elif hi < 1 - threshold:
+                verdict = IMPROVED
+            else:
+                verdict = UNCHANGED
+            rval.append((size, metric, ratio, lo, hi, verdict))
+    return rval
+
+
+def check_meta(results, baseline):
+    """
+    Return descriptions of the differences between the environments in
+    which the two runs were made which may make them incomparable.
+    """
+    rval = []
+    for key in ('python', 'implementation', 'numpy', 'seed'):
+        if results['meta'].get(key) != baseline['meta'].get(key):
+            rval.append("{0} differs : {1} in baseline, {2} in results"
+                        "".format(key, baseline['meta'].get(key),
+                                  results['meta'].get(key)))
+    for size, bresult in baseline['results'].items():
+        result = results['results'].get(size)
+        if result is None:
+            rval.append("{0} symbols not in results".format(size))
+        elif result['symbols'] != bresult['symbols']:
+            rval.append("{0} symbols : library has {1} symbols in "
+                        "baseline, {2} in results"
+                        "".format(size, bresult['symbols'],
+                                  result['symbols']))
+    return rval
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare EDA symbol library benchmark results "
+                    "against a baseline."
+    )
+    parser.add_argument('results',
+                        help="Results JSON written by library_bench.py")
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE,
+                        help="Baseline JSON written by library_bench.py")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help="Fractional slowdown tolerated")
+    parser.add_argument('-c', '--confidence', type=float, default=0.95,
+                        help="Confidence level of the interval")
+    parser.add_argument('-n', '--resamples', type=int, default=2000,
+                        help="Number of bootstrap resamples")
+    parser.add_argument('-m', '--metric', action='append', dest='metrics',
+                        help="Only compare this metric. May be repeated.")
+    args = parser.parse_args()
+
+    with open(args.results) as f:
+        results = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    for warning in check_meta(results, baseline):
+        print("WARNING : {0}".format(warning))
+
+    comparisons = compare(results, baseline, threshold=args.threshold,
+                          confidence=args.confidence,
+                          resamples=args.resamples, metrics=args.metrics)
+    regressions = 0
+    for size, metric, ratio, lo, hi, verdict in comparisons:
+        print("{0:>7} {1:24} {2:6.3f}x  [{3:6.3f}, {4:6.3f}]  {5}"
+              "".format(size, metric, ratio, lo, hi, verdict))
+        if verdict == REGRESSED:
+            regressions += 1
+
+    if not comparisons:
+        print("No measurements in common with the baseline.")
+        return 2
+    if regressions:
+        print("{0} of {1} measurements regressed by more than {2:.0%} "
+              "at {3:.0%} confidence."
+              "".format(regressions, len(comparisons), args.threshold,
+                        args.confidence))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Symbol Memory Benchmark
+---------------------------
+
+Compares the memory used by :class:`EDASymbolBase` instances with that
+used by instances of an equivalent class which keeps all of its fields
+in the instance ``__dict__``, as :class:`EDASymbolBase` used to.
+
+Usage::
+
+    python benchmarks/symbol_memory.py [nsymbols]
+
+"""
+
+import sys
+import gc
+import tracemalloc
+
+from tendril.conventions.status import get_status
+from tendril.validation.base import ValidatableBase
+from tendril.entities.edasymbols.base import EDASymbolBase
+
+import arrow
+
+
+DEVICES = ['RES SMD', 'CAP CER SMD', 'CAP ELEC THRU', 'IC SMD', 'CONN BERG']
+FOOTPRINTS = ['0402', '0603', '0805', '1206', 'SOIC-8', 'MLF-32']
+
+
+def symbol_fields(idx):
+    # Strings are built afresh for each symbol, as they would be when
+    # parsed out of symbol files.
+    return {
+        'device': ''.join(DEVICES[idx % len(DEVICES)]),
+        'value': '{0}K'.format(idx),
+        'footprint': ''.join(FOOTPRINTS[idx % len(FOOTPRINTS)]),
+        'status': 'Active',
+        'description': 'Synthetic Symbol {0}'.format(idx),
+        'package': 'smd',
+        'last_updated': '2019-01-01T00:00:00',
+    }
+
+
+class SlottedSymbol(EDASymbolBase):
+    def __init__(self, fields):
+        self._fields = fields
+        super(SlottedSymbol, self).__init__()
+        del self._fields
+
+    def _get_sym(self):
+        for key, value in self._fields.items():
+            setattr(self, key, value)
+
+    def _generate_img_repr(self):
+        pass
+
+
+class DictSymbol(ValidatableBase):
+    def __init__(self, fields):
+        super(DictSymbol, self).__init__()
+        self.device = fields['device']
+        self.value = fields['value']
+        self.footprint = fields['footprint']
+        self._status = get_status(fields['status'])
+        self.description = fields['description']
+        self.package = fields['package']
+        self._last_updated = arrow.get(fields['last_updated'])
+        self._datasheet = None
+        self._manufacturer = None
+        self._vendors = None
+        self._indicative_sourcing_info = None
+        self._img_repr_path = None
+
+
+def measure(cls, n):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    symbols = [cls(symbol_fields(idx)) for idx in range(n)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del symbols
+    return used
+
+
+def main(n=20000):
+    results = {}
+    for cls in (DictSymbol, SlottedSymbol):
+        used = measure(cls, n)
+        results[cls.__name__] = used
+        print("{0:15} {1:8} symbols {2:12} bytes {3:8.1f} bytes/symbol"
+              "".format(cls.__name__, n, used, float(used) / n))
+    saved = results['DictSymbol'] - results['SlottedSymbol']
+    print("Saved {0:.1f}%".format(100.0 * saved / results['DictSymbol']))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Synthetic EDA Symbol Libraries
+------------------------------
+
+A generator for synthetic libraries in the minimal symbol file format of
+:mod:`tests.edasymbols`, for use by the benchmarks. The benchmarks load
+them with the same symbol, generator and library classes that the tests
+use, opted in to the parse cache.
+
+Usage::
+
+    python benchmarks/synthlib.py <path> <nsymbols> [seed]
+
+"""
+
+import os
+import sys
+import random
+
+# The symbol classes and file writers are shared with the tests.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tendril.schema.edasymbols import get_series_values     # noqa
+
+from tests.edasymbols import KVSymbol                       # noqa
+from tests.edasymbols import KVSymbolLibrary                # noqa
+from tests.edasymbols import write_symbol                   # noqa
+from tests.edasymbols import write_generator                # noqa
+
+import iec60063                                             # noqa
+
+
+class BenchSymbol(KVSymbol):
+    __slots__ = ()
+    _cache_fields = KVSymbol._sym_fields
+
+
+class BenchSymbolLibrary(KVSymbolLibrary):
+    _symbol_class = BenchSymbol
+
+
+FOOTPRINTS = ['0402', '0603', '0805', '1206', '2512']
+WATTAGES = {'0402': '0.063W', '0603': '0.1W', '0805': '0.125W',
+            '1206': '0.25W', '2512': '1W'}
+VOLTAGES = ['6.3V', '16V', '25V', '50V', '100V']
+OTHER_DEVICES = ['IC SMD', 'CONN BERG STRIP', 'DIODE SMD', 'LED SMD']
+OTHER_FOOTPRINTS = ['SOIC-8', 'TSSOP-20', 'QFN-32', 'SOD-123', 'PIN-10']
+
+# (series, start, end) ranges used by generators.
+RESISTOR_RANGES = [('E24', '10E', '1M'), ('E12', '1E', '10M'),
+                   ('E48', '100E', '100K'), ('E96', '1K', '100K')]
+CAPACITOR_RANGES = [('E6', '10pF', '10uF'), ('E12', '1nF', '1uF'),
+                    ('E24', '10pF', '10nF')]
+
+FILES_PER_FOLDER = 500
+
+
+def _timestamp(rng):
+    return '20{0:02d}-{1:02d}-{2:02d}T{3:02d}:00:00'.format(
+        rng.randint(15, 20), rng.randint(1, 12),
+        rng.randint(1, 28), rng.randint(0, 23)
+    )
+
+
+def _write_resistor_generator(folder, name, rng):
+    footprint = rng.choice(FOOTPRINTS)
+    series, start, end = rng.choice(RESISTOR_RANGES)
+    wattage = WATTAGES[footprint]
+    genpath = write_generator(
+        os.path.join(folder, name + '.sym'), 'RES SMD', footprint,
+        'resistor', series, start, end, last_updated=_timestamp(rng),
+        symbol_fields={'description': 'Resistor generator',
+                       'package': 'smd'},
+        wattage=wattage
+    )
+    lines = [
+        'composite_series:',
+        '  name: {0}'.format(name.upper()),
+        '  desc: {0} {1} resistors'.format(footprint, series),
+        'custom_series:',
+        '  {0}PRECISION:'.format(name.upper()),
+        '    detail:',
+        '      type: resistor',
+        '      desc: Precision',
+        '    values:',
+        '      1K: 1K/{0}/1%'.format(wattage),
+        '      10K: 10K/{0}/1%'.format(wattage),
+    ]
+    with open(genpath, 'a') as f:
+        f.write('\n'.join(lines) + '\n')
+    values = get_series_values(series, iec60063.res_ostrs, start, end)
+    return len(values) + 2
+
+
+def _write_capacitor_generator(folder, name, rng):
+    footprint = rng.choice(FOOTPRINTS)
+    series, start, end = rng.choice(CAPACITOR_RANGES)
+    voltage = rng.choice(VOLTAGES)
+    write_generator(
+        os.path.join(folder, name + '.sym'), 'CAP CER SMD', footprint,
+        'capacitor', series, start, end, last_updated=_timestamp(rng),
+        symbol_fields={'description': 'Capacitor generator',
+                       'package': 'smd'},
+        voltage=voltage
+    )
+    values = get_series_values(series, iec60063.cap_ostrs, start, end)
+    return len(values)
+
+
+def _concrete_fields(rng):
+    kind = rng.random()
+    if kind < 0.45:
+        footprint = rng.choice(FOOTPRINTS)
+        value = rng.choice(list(get_series_values('E24', iec60063.res_ostrs,
+                                                  '1E', '10M')))
+        if rng.random() < 0.5:
+            value = '{0}/{1}'.format(value, WATTAGES[footprint])
+        return 'RES SMD', value, footprint
+    if kind < 0.85:
+        value = rng.choice(list(get_series_values('E12', iec60063.cap_ostrs,
+                                                  '1pF', '100uF')))
+        if rng.random() < 0.5:
+            value = '{0}/{1}'.format(value, rng.choice(VOLTAGES))
+        return 'CAP CER SMD', value, rng.choice(FOOTPRINTS)
+    return (rng.choice(OTHER_DEVICES),
+            'PART{0}'.format(rng.randint(1, 10 ** 6)),
+            rng.choice(OTHER_FOOTPRINTS))
+
+
+def generate_library(path, nsymbols, seed=0, generated_fraction=0.4):
+    """
+    Write a synthetic symbol library with approximately ``nsymbols``
+    symbols to ``path``. About ``generated_fraction`` of the symbols are
+    produced by resistor and capacitor generators, and the rest are
+    concrete symbols, mostly resistors and capacitors.
+
+    Returns a dictionary describing what was written.
+    """
+    rng = random.Random(seed)
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    def _folder(idx):
+        folder = os.path.join(path, 'f{0:04d}'.format(idx // FILES_PER_FOLDER))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        return folder
+
+    nfiles = 0
+    generated = 0
+    ngenerators = 0
+    while generated < generated_fraction * nsymbols:
+        name = 'gen{0:02d}{1:05d}'.format(seed, ngenerators)
+        if ngenerators % 3 == 2:
+            count = _write_capacitor_generator(_folder(nfiles), name, rng)
+        else:
+            count = _write_resistor_generator(_folder(nfiles), name, rng)
+        generated += count
+        ngenerators += 1
+        nfiles += 1
+
+    concrete = max(nsymbols - generated, 0)
+    for idx in range(concrete):
+        device, value, footprint = _concrete_fields(rng)
+        fpath = os.path.join(_folder(nfiles), 's{0:07d}.sym'.format(idx))
+        write_symbol(fpath, device, value, footprint,
+                     status=rng.choice(['Active'] * 8 + ['Experimental',
+                                                         'Deprecated']),
+                     last_updated=_timestamp(rng),
+                     description='Synthetic symbol {0}'.format(idx),
+                     package='smd')
+        nfiles += 1
+
+    return {
+        'path': path,
+        'symbols': generated + concrete,
+        'generated': generated,
+        'generators': ngenerators,
+        'files': nfiles,
+        'seed': seed,
+    }
+
+
+if __name__ == '__main__':
+    print(generate_library(sys.argv[1], int(sys.argv[2]),
+                           *[int(x) for x in sys.argv[3:4]]))
@@ -83,6 +83,7 @@ setup(
     setup_requires=setup_requires,
     extras_require={
         'docs': doc_requires,
+        'numpy': ['numpy'],
         'tests': test_requires,
         'build': build_requires,
         'publish': publish_requires,
@@ -4,7 +4,8 @@ from tendril.utils.config import ConfigOption
 from tendril.utils import log
 logger = log.get_logger(__name__, log.DEFAULT)
 
-depends = ['tendril.config.core']
+depends = ['tendril.config.core',
+           'tendril.config.paths']
 
 
 config_elements_eda = [
@@ -20,7 +21,65 @@ config_elements_eda = [
         'EDA_LIBRARY_PRIORITY',
         "['geda']",
         "Priority order for the EDA symbol libraries."
-    )
+    ),
+    ConfigOption(
+        'EDA_LIBRARY_LAZY',
+        "False",
+        "Whether to defer importing and loading the EDA symbol library "
+        "modules until the libraries are first used. If False, they are "
+        "all loaded when tendril.libraries.edasymbols is imported."
+    ),
+    ConfigOption(
+        'EDA_SYMBOL_CACHE',
+        "os.path.join(INSTANCE_CACHE, 'edasymbols')",
+        "Folder in which the fields parsed from EDA symbol files are cached "
+        "across runs, so that unchanged symbol files need not be re-parsed "
+        "when the libraries are loaded. Only symbol classes which declare "
+        "the fields they parse, in _cache_fields, are cached. None do by "
+        "default. If None, the parse cache is only maintained in memory."
+    ),
+    ConfigOption(
+        'EDA_SYMBOL_IMAGE_CACHE',
+        "os.path.join(INSTANCE_CACHE, 'edasymbols', 'images')",
+        "Folder in which rendered EDA symbol images are cached, keyed by "
+        "the content of the symbol file they were rendered from. If None, "
+        "images are rendered whenever they are needed."
+    ),
+    ConfigOption(
+        'EDA_SYMBOL_IMAGE_CACHE_SIZE',
+        "256 * 1024 * 1024",
+        "Maximum size of the EDA symbol image cache, in bytes. The least "
+        "recently used images are evicted when this is exceeded."
+    ),
+    ConfigOption(
+        'EDA_SYMBOL_IMAGE_FOLDER',
+        "os.path.join(INSTANCE_CACHE, 'edasymbols', 'rendered')",
+        "Folder in which rendered EDA symbol images are made available, "
+        "in a subfolder per symbol class, for symbol classes which do not "
+        "specify a folder of their own. Images from the EDA symbol image "
+        "cache are linked here, and remain available when they are "
+        "evicted from the cache."
+    ),
+    ConfigOption(
+        'EDA_LIBRARY_WORKERS',
+        "0",
+        "Number of worker processes to use to parse symbol files when "
+        "loading EDA symbol libraries. Parsing is done serially in the "
+        "loading process if this is less than 2, and for symbol classes "
+        "which do not opt in to the parse cache."
+    ),
+    ConfigOption(
+        'EDA_SOURCING_CACHE_TTL',
+        "3600",
+        "Time, in seconds, for which sourcing information obtained for "
+        "EDA symbols is reused."
+    ),
+    ConfigOption(
+        'EDA_SOURCING_CACHE_SIZE',
+        "4096",
+        "Maximum number of (ident, qty) sourcing lookups retained for "
+        "EDA symbols. The least recently used lookups are evicted first."
+    ),
 ]
 
 
@@ -21,6 +21,7 @@
 
 import os
 import arrow
+from six.moves import intern
 
 from tendril.conventions.status import get_status
 from tendril.conventions.status import Status
@@ -30,22 +31,97 @@ from tendril.conventions.electronics import fpiswire
 from tendril.conventions.electronics import fpismodlen
 
 from tendril.validation.base import ValidatableBase
+from tendril.validation.base import ValidationContext
+from tendril.validation.base import ErrorCollector
 from tendril.utils.types.lengths import Length
 
 from tendril.schema import EDASymbolGeneratorBase
 
+from tendril.config import EDA_SYMBOL_IMAGE_FOLDER
+
+from .cache import EDASymbolImageCache
+from .cache import get_parse_cache
+from .cache import get_image_cache
+from .cache import get_sourcing_cache
+from .cache import get_generator_cache
+
+
+_validation_contexts = {}
+
+
+def _get_validation_context(cls):
+    # All symbols of a class share the same validation context, rather
+    # than each holding its own. This is only safe as long as the context
+    # is never modified once created. Validation policies only hold a
+    # reference to it, and anything needing a more specific locality must
+    # derive one with ``child()``, which returns a copy.
+    if cls not in _validation_contexts:
+        _validation_contexts[cls] = ValidationContext(cls.__name__)
+    return _validation_contexts[cls]
+
+
+def _intern(value):
+    # Devices and footprints are shared by large numbers of symbols.
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
 
 class EDASymbolBase(ValidatableBase):
+    # Libraries hold many thousands of symbols, so the fields common to
+    # all symbols are kept in slots rather than in the instance __dict__.
+    # Subclasses are free to add attributes of their own as usual.
+    __slots__ = ('_ident', '_ident_generic', '_device', '_value',
+                 '_footprint', '_status', 'description', 'package',
+                 '_last_updated', '_datasheet', '_manufacturer', '_vendors',
+                 '_indicative_sourcing_info', '_img_repr_path', '_errors')
+
     _gen_class = EDASymbolGeneratorBase
 
+    # Symbols are only held in the parse cache if their class opts in by
+    # listing, in _cache_fields, everything its _get_sym() sets. Only
+    # those fields are restored from the cache, and _get_sym() is not
+    # called at all on a hit. _sym_fields holds the fields the base class
+    # knows about, which subclasses can extend with their own. Nothing
+    # here opts in, so neither the parse cache nor the parallel loading
+    # of libraries, which relies on it, are used until the EDA suite
+    # specific symbol classes set _cache_fields.
+    _cache_fields = None
+    _sym_fields = ('device', 'value', 'footprint', 'status',
+                   'description', 'package', 'last_updated',
+                   '_datasheet', '_manufacturer')
+
+    # The slots behind the fields which are set through properties. None
+    # is restored from the cache directly into these, since the setters
+    # do not accept it.
+    _sym_slots = {'device': '_device', 'value': '_value',
+                  'footprint': '_footprint', 'status': '_status',
+                  'last_updated': '_last_updated'}
+
     def __init__(self):
         """
         Base class for EDA symbols. This class should not be used directly,
         but sub-classed per EDA suite, the sub-classes designed to interface
         with the way each EDA suite handles symbol libraries.
 
+        Sub-classes implement ``_get_sym()`` to parse the symbol, and
+        ``_generate_img_repr()`` to render its image, setting
+        ``_img_repr_path`` to the rendered file. Images are not rendered
+        when the symbol is constructed, but when ``img_repr_path`` is
+        first read.
+
+        Symbols of the same class share a single validation context,
+        which must be treated as immutable. Use
+        ``self._validation_context.child()`` to obtain a context with a
+        more specific locality.
+
         """
-        super(EDASymbolBase, self).__init__()
+        self._errors = None
+        super(EDASymbolBase, self).__init__(
+            vctx=_get_validation_context(self.__class__)
+        )
+        self._ident = None
+        self._ident_generic = None
         self.device = ''
         self.value = ''
         self.footprint = ''
@@ -59,15 +135,145 @@ class EDASymbolBase(ValidatableBase):
         self._indicative_sourcing_info = None
         self._img_repr_path = None
 
-        self._get_sym()
-        self._generate_img_repr()
+        self._load_sym()
 
     def _get_sym(self):
         raise NotImplementedError
 
+    # Symbols rarely accumulate validation errors, so the error collector
+    # is only created when it is first needed. ValidatableBase installs
+    # an empty one for every instance, which is dropped here.
+    @property
+    def _validation_errors(self):
+        if self._errors is None:
+            self._errors = ErrorCollector()
+        return self._errors
+
+    @_validation_errors.setter
+    def _validation_errors(self, value):
+        if value is not None and not value.terrors:
+            value = None
+        self._errors = value
+
+    @classmethod
+    def _cache_namespace(cls):
+        return '{0}.{1}'.format(cls.__module__, cls.__name__)
+
+    def _dump_cache_fields(self):
+        rval = {}
+        for field in self._cache_fields:
+            value = getattr(self, field)
+            if isinstance(value, Status):
+                value = str(value)
+            elif isinstance(value, arrow.Arrow):
+                value = value.isoformat()
+            rval[field] = value
+        return rval
+
+    def _load_cache_fields(self, fields):
+        for field, value in fields.items():
+            if value is None:
+                setattr(self, self._sym_slots.get(field, field), None)
+            else:
+                setattr(self, field, value)
+        self._clear_idents()
+
+    def _load_sym(self):
+        # Symbols are only cached if they know where they come from.
+        if not self._cache_fields:
+            self._get_sym()
+            return
+        try:
+            fpath = self.gpath
+        except (NotImplementedError, AttributeError):
+            fpath = None
+        if not fpath:
+            self._get_sym()
+            return
+        cache = get_parse_cache()
+        fields = cache.get(self._cache_namespace(), fpath)
+        if fields is not None:
+            self._load_cache_fields(fields)
+            return
+        self._get_sym()
+        cache.put(self._cache_namespace(), fpath, self._dump_cache_fields())
+
     def _generate_img_repr(self):
         raise NotImplementedError
 
+    def _get_img_repr(self):
+        # Rendered images are cached against the content of the symbol
+        # file, so an unchanged symbol costs a hash and a link rather than
+        # a render. Images are always placed at img_repr_target, never
+        # used from within the cache, which may evict them at any time.
+        cache = get_image_cache()
+        try:
+            fpath = self.gpath
+            target = self.img_repr_target
+        except (NotImplementedError, AttributeError):
+            fpath, target = None, None
+        if not fpath or not target:
+            self._generate_img_repr()
+            return
+        key = None
+        if cache is not None:
+            try:
+                key = cache.get_key(self._cache_namespace(), fpath)
+            except (IOError, OSError):
+                pass
+        if key is not None:
+            blob = cache.get(key)
+            if blob is not None:
+                try:
+                    cache.link(blob, target)
+                except (IOError, OSError):
+                    # Evicted since it was found.
+                    pass
+                else:
+                    self._img_repr_path = target
+                    return
+        self._generate_img_repr()
+        rendered = self._img_repr_path
+        if not rendered or not os.path.exists(rendered):
+            return
+        if key is not None:
+            cache.put(key, rendered)
+        if os.path.abspath(rendered) != os.path.abspath(target):
+            EDASymbolImageCache.link(rendered, target)
+            self._img_repr_path = target
+
+    # The idents are derived from these, and are cached until they change.
+    def _clear_idents(self):
+        self._ident = None
+        self._ident_generic = None
+
+    @property
+    def device(self):
+        return self._device
+
+    @device.setter
+    def device(self, value):
+        self._device = _intern(value)
+        self._clear_idents()
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._clear_idents()
+
+    @property
+    def footprint(self):
+        return self._footprint
+
+    @footprint.setter
+    def footprint(self, value):
+        self._footprint = _intern(value)
+        self._clear_idents()
+
     @property
     def status(self):
         return self._status
@@ -79,23 +285,33 @@ class EDASymbolBase(ValidatableBase):
         else:
             self._status = value
 
+    # Kept as a plain datetime, which is much smaller than the
+    # equivalent arrow object.
     @property
     def last_updated(self):
-        return self._last_updated
+        if self._last_updated is None:
+            return None
+        return arrow.Arrow.fromdatetime(self._last_updated)
 
     @last_updated.setter
     def last_updated(self, value):
-        self._last_updated = arrow.get(value)
+        self._last_updated = arrow.get(value).datetime
 
     # Derived Properties
     @property
     def ident(self):
-        return ident_transform(self.device, self.value, self.footprint)
+        if self._ident is None:
+            self._ident = ident_transform(self.device, self.value,
+                                          self.footprint)
+        return self._ident
 
     @property
     def ident_generic(self):
-        return ident_transform(self.device, self.value, self.footprint,
-                               generic=True)
+        if self._ident_generic is None:
+            self._ident_generic = ident_transform(self.device, self.value,
+                                                  self.footprint,
+                                                  generic=True)
+        return self._ident_generic
 
     @property
     def is_wire(self):
@@ -107,8 +323,51 @@ class EDASymbolBase(ValidatableBase):
 
     @property
     def img_repr_fname(self):
+        """
+        The name of the rendered image of the symbol. Images are rendered
+        lazily, so the file is only guaranteed to exist once
+        ``img_repr_path`` has been read, or once the library's
+        ``prerender_images()`` has rendered it. Use ``img_repr_path`` to
+        locate the image rather than this.
+        """
         return os.path.splitext(self.gname)[0] + '.png'
 
+    @property
+    def img_repr_folder(self):
+        """
+        The folder in which the rendered image of the symbol is placed.
+        Subclasses which render their images into a folder of their own
+        should return it here, so that cached images are placed there
+        as well.
+        """
+        if not EDA_SYMBOL_IMAGE_FOLDER:
+            return None
+        return os.path.join(EDA_SYMBOL_IMAGE_FOLDER, self._cache_namespace())
+
+    @property
+    def img_repr_target(self):
+        """
+        The path at which the rendered image of the symbol is placed,
+        named by img_repr_fname. Images served from the image cache and
+        images rendered elsewhere are linked here.
+        """
+        folder = self.img_repr_folder
+        if folder is None:
+            return None
+        return os.path.join(folder, self.img_repr_fname)
+
+    @property
+    def img_repr_path(self):
+        """
+        The path to the rendered image of the symbol, which is rendered
+        if it does not already exist.
+        """
+        if self._img_repr_path is None or \
+                not os.path.exists(self._img_repr_path):
+            self._img_repr_path = None
+            self._get_img_repr()
+        return self._img_repr_path
+
     @property
     def indicative_sourcing_info(self):
         if self._indicative_sourcing_info is None:
@@ -116,24 +375,45 @@ class EDASymbolBase(ValidatableBase):
         return self._indicative_sourcing_info
 
     def sourcing_info_qty(self, qty):
+        return self.sourcing_info_qtys([qty])[0]
+
+    def sourcing_info_qtys(self, qtys):
+        """
+        Return the sourcing information for each of the quantities in
+        ``qtys``, in the same order. Quantities which map to the same
+        compliant quantity are only looked up once.
+        """
         # TODO Complete Migration
         try:
             from tendril.inventory.guidelines import electronics_qty
             from tendril.sourcing.electronics import get_sourcing_information
             from tendril.sourcing.electronics import SourcingException
         except ImportError:
-            return []
-        if fpiswire(self.device) and not isinstance(qty, Length):
-            iqty = Length(qty)
-        else:
-            iqty = qty
-        iqty = electronics_qty.get_compliant_qty(self.ident, iqty)
-        try:
-            vsi = get_sourcing_information(self.ident, iqty,
-                                           allvendors=True)
-        except SourcingException:
-            vsi = []
-        return vsi
+            return [[] for _ in qtys]
+        ident = self.ident
+        is_wire = fpiswire(self.device)
+        cache = get_sourcing_cache()
+        results = {}
+        rval = []
+        for qty in qtys:
+            if is_wire and not isinstance(qty, Length):
+                qty = Length(qty)
+            iqty = electronics_qty.get_compliant_qty(ident, qty)
+            # Quantity types are not hashable, so they're keyed by repr.
+            key = (ident, repr(iqty))
+            if key not in results:
+                vsi = cache.get(key)
+                if vsi is None:
+                    try:
+                        vsi = get_sourcing_information(ident, iqty,
+                                                       allvendors=True)
+                    except SourcingException:
+                        vsi = []
+                    else:
+                        cache.put(key, vsi)
+                results[key] = vsi
+            rval.append(results[key])
+        return rval
 
     @property
     def datasheet_url(self):
@@ -232,16 +512,17 @@ class EDASymbolBase(ValidatableBase):
     def generator(self):
         if not self.is_generator:
             raise AttributeError
-        return self._gen_class(self.genpath)
+        return get_generator_cache().get(self._gen_class, self.genpath)
 
     @property
     def idents(self):
         if not self.is_generator:
             raise AttributeError
-        if not self.generator.values:
+        values = self.generator.values
+        if not values:
             return None
         return [ident_transform(self.device, v, self.footprint)
-                for v in self.generator.values]
+                for v in values]
 
     def __repr__(self):
         return '{0:40}'.format(self.ident)
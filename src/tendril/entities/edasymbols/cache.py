@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Symbol Caches
+-----------------
+
+Persistent cache of the fields parsed out of EDA symbol files, for the
+symbol classes which declare the fields they parse in ``_cache_fields``.
+Symbol classes do not do so by default, and are then always parsed from
+their files. Entries are keyed by the path of the symbol file and are
+validated against the file's mtime and size. If either of those has
+changed, the content hash of the file is checked before the entry is
+discarded, so that files which are merely touched (by a VCS checkout, for
+instance) are not re-parsed.
+
+Images rendered from symbol files are cached separately, keyed by the
+content hash of the symbol file alone. Identical symbol files therefore
+share a single rendered image, wherever they are. Cached images are
+linked to wherever each symbol places its image, and are never used from
+within the cache, so that evicting them does not affect the symbols.
+
+Sourcing information is cached in memory only, keyed by ident and the
+compliant quantity, and expires after a configurable time.
+
+Parsed symbol generator files are also cached in memory, shared by all
+the symbols and libraries in the process, and are reparsed when the
+generator file changes.
+"""
+
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from tendril.config import EDA_SYMBOL_CACHE
+from tendril.config import EDA_SYMBOL_IMAGE_CACHE
+from tendril.config import EDA_SYMBOL_IMAGE_CACHE_SIZE
+from tendril.config import EDA_SOURCING_CACHE_TTL
+from tendril.config import EDA_SOURCING_CACHE_SIZE
+
+from tendril.utils import log
+logger = log.get_logger(__name__, log.DEFAULT)
+
+
+def _makedirs(folder):
+    # Images are placed from several threads at once, which may race to
+    # create the same folder.
+    try:
+        os.makedirs(folder)
+    except OSError:
+        if not os.path.isdir(folder):
+            raise
+
+
+def get_content_hash(fpath, blocksize=65536):
+    hasher = hashlib.sha1()
+    with open(fpath, 'rb') as f:
+        buf = f.read(blocksize)
+        while len(buf) > 0:
+            hasher.update(buf)
+            buf = f.read(blocksize)
+    return hasher.hexdigest()
+
+
+class EDASymbolParseCache(object):
+    _fname = 'symbols.json'
+    _version = 1
+
+    def __init__(self, path=None):
+        self._path = path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    @property
+    def fpath(self):
+        if self._path is None:
+            return None
+        return os.path.join(self._path, self._fname)
+
+    def _load(self):
+        self._entries = {}
+        if self.fpath is None or not os.path.exists(self.fpath):
+            return
+        try:
+            with open(self.fpath, 'r') as f:
+                content = json.load(f)
+        except (IOError, OSError, ValueError):
+            logger.warning("Discarding unreadable EDA symbol parse cache {0}"
+                           "".format(self.fpath))
+            return
+        if content.get('version') != self._version:
+            return
+        self._entries = content['entries']
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._load()
+        return self._entries
+
+    def get(self, namespace, fpath):
+        """
+        Return the cached fields for the symbol file at ``fpath``, or
+        None if there is no valid entry for it.
+        """
+        entry = self.entries.get(fpath)
+        if entry is None or entry['namespace'] != namespace:
+            return None
+        try:
+            stat = os.stat(fpath)
+        except OSError:
+            return None
+        if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            return entry['fields']
+        if get_content_hash(fpath) != entry['hash']:
+            return None
+        with self._lock:
+            entry['mtime'] = stat.st_mtime
+            entry['size'] = stat.st_size
+            self._dirty = True
+        return entry['fields']
+
+    @staticmethod
+    def build_entry(namespace, fpath, fields):
+        stat = os.stat(fpath)
+        return {
+            'namespace': namespace,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'hash': get_content_hash(fpath),
+            'fields': fields,
+        }
+
+    def put(self, namespace, fpath, fields):
+        try:
+            entry = self.build_entry(namespace, fpath, fields)
+        except (IOError, OSError):
+            return
+        self.put_entry(fpath, entry)
+
+    def put_entry(self, fpath, entry):
+        with self._lock:
+            self.entries[fpath] = entry
+            self._dirty = True
+
+    def discard(self, fpath):
+        with self._lock:
+            if self.entries.pop(fpath, None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        """
+        Write the cache out to disk, if it has changed since it was last
+        loaded or written. The file is replaced atomically, so concurrent
+        writers will not corrupt it. The last writer wins.
+        """
+        if not self._dirty or self.fpath is None:
+            return
+        with self._lock:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+            tmppath = '{0}.{1}.tmp'.format(self.fpath, os.getpid())
+            content = json.dumps({'version': self._version,
+                                  'entries': self._entries})
+            with open(tmppath, 'w') as f:
+                f.write(content)
+            os.rename(tmppath, self.fpath)
+            self._dirty = False
+
+
+_parse_cache = None
+
+
+def get_parse_cache():
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = EDASymbolParseCache(EDA_SYMBOL_CACHE)
+    return _parse_cache
+
+
+def set_parse_cache(cache):
+    global _parse_cache
+    _parse_cache = cache
+
+
+class EDASymbolImageCache(object):
+    _ext = '.png'
+
+    def __init__(self, path, max_size):
+        self._path = path
+        self._max_size = max_size
+        self._size = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def get_key(namespace, fpath):
+        hasher = hashlib.sha1()
+        hasher.update(namespace.encode('utf-8'))
+        hasher.update(get_content_hash(fpath).encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _blob_path(self, key):
+        return os.path.join(self._path, key[:2], key + self._ext)
+
+    def _blobs(self):
+        for root, _, files in os.walk(self._path):
+            for fname in files:
+                if fname.endswith(self._ext):
+                    yield os.path.join(root, fname)
+
+    @property
+    def size(self):
+        if self._size is None:
+            with self._lock:
+                self._size = sum(os.path.getsize(x) for x in self._blobs())
+        return self._size
+
+    def get(self, key):
+        """
+        Return the path to the cached image for ``key``, or None if
+        there is no such image. A hit refreshes the image's position in
+        the eviction order.
+        """
+        blob = self._blob_path(key)
+        try:
+            os.utime(blob, None)
+        except OSError:
+            return None
+        return blob
+
+    def put(self, key, imgpath):
+        blob = self._blob_path(key)
+        folder = os.path.dirname(blob)
+        if not os.path.exists(folder):
+            _makedirs(folder)
+        fd, tmppath = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(imgpath, tmppath)
+        with self._lock:
+            size = self.size
+            if os.path.exists(blob):
+                size -= os.path.getsize(blob)
+            os.rename(tmppath, blob)
+            self._size = size + os.path.getsize(blob)
+            if self._size > self._max_size:
+                self._evict()
+        return blob
+
+    def _evict(self):
+        # Evict the least recently used images until the cache is a
+        # little below its limit, so that eviction isn't triggered by
+        # every subsequent put.
+        target = 0.9 * self._max_size
+        blobs = []
+        for blob in self._blobs():
+            stat = os.stat(blob)
+            blobs.append((stat.st_mtime, stat.st_size, blob))
+        blobs.sort()
+        size = sum(x[1] for x in blobs)
+        for _, bsize, blob in blobs:
+            if size <= target:
+                break
+            try:
+                os.remove(blob)
+            except OSError:
+                continue
+            size -= bsize
+        self._size = size
+
+    @staticmethod
+    def link(blob, target):
+        """
+        Make the cached image at ``blob`` available at ``target``, as a
+        hard link if possible or as a copy otherwise.
+        """
+        if os.path.exists(target):
+            if os.path.samefile(blob, target):
+                return
+            os.remove(target)
+        folder = os.path.dirname(target)
+        if folder and not os.path.exists(folder):
+            _makedirs(folder)
+        try:
+            os.link(blob, target)
+        except (OSError, AttributeError):
+            shutil.copyfile(blob, target)
+
+
+_image_cache = None
+
+
+def get_image_cache():
+    global _image_cache
+    if _image_cache is None and EDA_SYMBOL_IMAGE_CACHE:
+        _image_cache = EDASymbolImageCache(EDA_SYMBOL_IMAGE_CACHE,
+                                           int(EDA_SYMBOL_IMAGE_CACHE_SIZE))
+    return _image_cache
+
+
+class EDASourcingCache(object):
+    def __init__(self, ttl, max_size):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached sourcing information for ``key``, or None if
+        there is none or if it has expired.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self._ttl:
+                return None
+            self._entries[key] = entry
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), value)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_sourcing_cache = None
+
+
+def get_sourcing_cache():
+    global _sourcing_cache
+    if _sourcing_cache is None:
+        _sourcing_cache = EDASourcingCache(int(EDA_SOURCING_CACHE_TTL),
+                                           int(EDA_SOURCING_CACHE_SIZE))
+    return _sourcing_cache
+
+
+class EDASymbolGeneratorCache(object):
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, gen_class, genpath):
+        """
+        Return the generator object of class ``gen_class`` for the
+        generator file at ``genpath``, parsing the file only if it has
+        not already been parsed or if it has changed since.
+        """
+        stat = os.stat(genpath)
+        state = (stat.st_mtime, stat.st_size)
+        key = (gen_class, genpath)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == state:
+            return entry[1]
+        generator = gen_class(genpath)
+        with self._lock:
+            self._entries[key] = (state, generator)
+        return generator
+
+    def discard(self, genpath):
+        with self._lock:
+            for key in [x for x in self._entries if x[1] == genpath]:
+                self._entries.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_generator_cache = EDASymbolGeneratorCache()
+
+
+def get_generator_cache():
+    return _generator_cache
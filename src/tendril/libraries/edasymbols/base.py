@@ -21,9 +21,29 @@
 
 import os
 import csv
+import six
+import copy
+import hashlib
+import arrow
+import heapq
+import bisect
+from itertools import chain
+from six import iteritems
+from threading import Thread
+from six.moves.queue import Queue
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport. Symbol files and sourcing
+    # information are then fetched serially.
+    ProcessPoolExecutor = None
+    ThreadPoolExecutor = None
+
 from tendril.config import AUDIT_PATH
+from tendril.config import EDA_LIBRARY_WORKERS
 
-from tendril.conventions.series import register_custom_series
 from tendril.conventions.electronics import ident_transform
 from tendril.conventions.electronics import resistor_tools
 from tendril.conventions.electronics import capacitor_tools
@@ -31,62 +51,347 @@ from tendril.conventions.electronics import jb_tools_for_ident
 
 from tendril.validation.base import ValidatableBase
 from tendril.entities.edasymbols.base import EDASymbolBase
+from tendril.entities.edasymbols.cache import EDASymbolParseCache
+from tendril.entities.edasymbols.cache import get_content_hash
+from tendril.entities.edasymbols.cache import get_generator_cache
+from tendril.entities.edasymbols.cache import get_parse_cache
+from tendril.entities.edasymbols.cache import set_parse_cache
+from tendril.libraries.edasymbols.jellybean import JellybeanPartition
 from tendril.schema.edasymbols import EDASymbolGeneratorBase
+from tendril.schema.edasymbols import register_series
 from tendril.utils.fsutils import VersionedOutputFile
 from tendril.utils.types import ParseException
 
+from tendril.utils import log
+logger = log.get_logger(__name__, log.DEFAULT)
+
 
 class EDASymbolNotFound(Exception):
     pass
 
 
+def _parse_symbol_files(symbol_class, fpaths):
+    # Runs in a worker process, with a throwaway in-memory cache for each
+    # chunk. Whatever is parsed is handed back to the loading process,
+    # which owns the persistent cache.
+    cache = EDASymbolParseCache()
+    set_parse_cache(cache)
+    rval = []
+    for fpath in fpaths:
+        symbol_class(fpath)
+        rval.append(cache.entries.get(fpath))
+    return rval
+
+
 class EDASymbolLibraryBase(ValidatableBase):
     _symbol_class = EDASymbolBase
     _generator_class = EDASymbolGeneratorBase
     _exc_class = EDASymbolNotFound
+    _symbol_ext = None
 
     def __init__(self, path, recursive=True,
                  resolve_generators=True, include_generators=False,
-                 **kwargs):
+                 workers=None, **kwargs):
         super(EDASymbolLibraryBase, self).__init__(**kwargs)
         self.path = path
         self._recursive = recursive
         self._resolve_generators = resolve_generators
         self._include_generators = include_generators
+        if workers is None:
+            workers = EDA_LIBRARY_WORKERS
+        self._workers = int(workers)
 
         self.symbols = []
         self.generators = []
         self.index = {}
+        self._generator_index = {}
+        self._generator_names = []
+        self._ident_generators = None
+        self._jb_index = {}
+        self._jb_partitions = {}
+        self._recent = {False: ([], []), True: ([], [])}
+
+        # Per-file bookkeeping, only maintained by the default
+        # _load_library() implementation. Libraries which override
+        # _load_library() do not support incremental regeneration.
+        self._files = None
+        self._file_order = []
+        self._file_symbols = {}
         self.regenerate()
 
     def get_folder_symbols(self, path=None, **kwargs):
         return self.__class__(path, **kwargs)
 
+    @staticmethod
+    def _file_state(fpath):
+        stat = os.stat(fpath)
+        return stat.st_mtime, stat.st_size
+
+    def _scan_library(self):
+        """
+        Return a dictionary mapping the path of every symbol file in the
+        library to its current state. The state of a symbol file includes
+        the state of its generator file, if it has one.
+        """
+        if self._symbol_ext is None:
+            raise NotImplementedError
+        if self._recursive:
+            walker = os.walk(self.path)
+        else:
+            walker = [(self.path, None, os.listdir(self.path))]
+        rval = {}
+        for root, _, files in walker:
+            for fname in files:
+                if not fname.endswith(self._symbol_ext):
+                    continue
+                fpath = os.path.join(root, fname)
+                state = self._file_state(fpath)
+                genpath = os.path.splitext(fpath)[0] + '.gen.yaml'
+                if os.path.exists(genpath):
+                    state += self._file_state(genpath)
+                rval[fpath] = state
+        return rval
+
+    def _get_file_symbols(self, fpath):
+        """
+        Return the symbols and generators provided by the symbol file at
+        ``fpath``. Generators are resolved into virtual symbols here. The
+        default implementation expects the symbol class to be constructed
+        from the path to the symbol file.
+        """
+        symbol = self._symbol_class(fpath)
+        if not symbol.is_generator:
+            return [symbol], []
+        symbols = []
+        if self._include_generators:
+            symbols.append(symbol)
+        if self._resolve_generators:
+            for value in symbol.generator.values:
+                vsymbol = copy.copy(symbol)
+                vsymbol.value = value
+                vsymbol.is_virtual = True
+                symbols.append(vsymbol)
+        return symbols, [symbol]
+
+    def _prefetch_files(self, fpaths):
+        """
+        Parse the given symbol files in a pool of worker processes and
+        seed the parse cache with the results, so that the symbols can
+        then be constructed cheaply, and in order, in this process.
+
+        Workers hand their results back through the parse cache, so this
+        is only done for symbol classes which opt in to it by setting
+        ``_cache_fields``. Other symbol classes are always parsed here,
+        whatever the number of workers.
+        """
+        if self._workers < 2 or not self._symbol_class._cache_fields:
+            return
+        if ProcessPoolExecutor is None:
+            return
+        cache = get_parse_cache()
+        namespace = self._symbol_class._cache_namespace()
+        pending = [x for x in fpaths if cache.get(namespace, x) is None]
+        if len(pending) < 2 * self._workers:
+            return
+        chunksize = -(-len(pending) // (4 * self._workers))
+        chunks = [pending[i:i + chunksize]
+                  for i in range(0, len(pending), chunksize)]
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            results = executor.map(_parse_symbol_files,
+                                   [self._symbol_class] * len(chunks),
+                                   chunks)
+            for chunk, entries in zip(chunks, results):
+                for fpath, entry in zip(chunk, entries):
+                    if entry is not None:
+                        cache.put_entry(fpath, entry)
+
     def _load_library(self):
-        raise NotImplementedError
+        self._files = self._scan_library()
+        self._file_order = sorted(self._files.keys())
+        self._file_symbols = {}
+        self._prefetch_files(self._file_order)
+        for fpath in self._file_order:
+            symbols, generators = self._get_file_symbols(fpath)
+            self._file_symbols[fpath] = (symbols, generators)
+            self.symbols.extend(symbols)
+            self.generators.extend(generators)
+
+    @staticmethod
+    def _jb_key(symbol):
+        return symbol.device, symbol.footprint
 
     def _generate_index(self):
         self.index = {}
+        self._jb_index = {}
+        self._jb_partitions = {}
         for symbol in self.symbols:
             ident = symbol.ident_generic
             if ident in self.index.keys():
                 self.index[ident].append(symbol)
             else:
                 self.index[ident] = [symbol]
+            self._jb_index.setdefault(self._jb_key(symbol), []).append(symbol)
+        self._set_recency_index(sorted(
+            (self._recency_key(x), idx, x)
+            for idx, x in enumerate(self.symbols)
+        ))
+
+    @staticmethod
+    def _patch_index(index, keyfunc, removed, added, position):
+        removed_ids = set(id(x) for x in removed)
+        added_by_key = {}
+        for symbol in added:
+            added_by_key.setdefault(keyfunc(symbol), []).append(symbol)
+        affected = set(keyfunc(x) for x in removed)
+        affected.update(added_by_key.keys())
+
+        for key in affected:
+            symbols = [x for x in index.get(key, [])
+                       if id(x) not in removed_ids]
+            symbols.extend(added_by_key.get(key, []))
+            if symbols:
+                index[key] = sorted(symbols, key=lambda x: position[id(x)])
+            else:
+                index.pop(key, None)
+        return affected
+
+    def _update_index(self, removed, added):
+        """
+        Patch the indices in place, given the symbols which have been
+        removed from and added to the library. Returns the set of idents
+        whose index entries have changed.
+        """
+        position = {id(x): idx for idx, x in enumerate(self.symbols)}
+        affected = self._patch_index(self.index, lambda x: x.ident_generic,
+                                     removed, added, position)
+        partitions = self._patch_index(self._jb_index, self._jb_key,
+                                       removed, added, position)
+        self._jb_partitions = {
+            k: v for k, v in iteritems(self._jb_partitions)
+            if k[1:] not in partitions
+        }
+
+        # Symbols which were already in the library retain their relative
+        # order, so the recency index only needs a merge.
+        removed_ids = set(id(x) for x in removed)
+        symbols, keys = self._recent[True]
+        kept = ((key, position[id(x)], x) for key, x in zip(keys, symbols)
+                if id(x) not in removed_ids)
+        added = sorted((self._recency_key(x), position[id(x)], x)
+                       for x in added)
+        self._set_recency_index(heapq.merge(kept, added))
+        return affected
+
+    @staticmethod
+    def _recency_key(symbol):
+        # Newest first, with symbols with no timestamp at the end.
+        if symbol.last_updated is None:
+            return float('inf')
+        return -symbol.last_updated.float_timestamp
+
+    def _set_recency_index(self, keyed):
+        """
+        Install the recency index from ``(key, position, symbol)`` tuples
+        in sorted order. The index is kept both with and without virtual
+        symbols, as parallel lists of symbols and keys.
+        """
+        everything = ([], [])
+        concrete = ([], [])
+        for key, _, symbol in keyed:
+            everything[0].append(symbol)
+            everything[1].append(key)
+            if symbol.is_virtual is False:
+                concrete[0].append(symbol)
+                concrete[1].append(key)
+        self._recent = {True: everything, False: concrete}
+
+    def _register_series(self, generators=None):
+        if generators is None:
+            generators = self.generators
+        register_series(chain.from_iterable(
+            generator.generator.iseries for generator in generators
+        ))
+
+    @staticmethod
+    def _discard_generators(old, new):
+        # Parsed generators are cached for the whole process, so those
+        # whose generator files are no longer in the library are dropped.
+        current = set(x.genpath for x in new)
+        cache = get_generator_cache()
+        for generator in old:
+            if generator.genpath not in current:
+                cache.discard(generator.genpath)
+
+    def _regenerate_incremental(self):
+        files = self._scan_library()
+        removed = [x for x in self._files if x not in files]
+        changed = [x for x in self._files
+                   if x in files and files[x] != self._files[x]]
+        added = [x for x in files if x not in self._files]
+        self._files = files
+        if not removed and not changed and not added:
+            return set()
+
+        cache = get_parse_cache()
+        old_symbols = []
+        old_generators = []
+        for fpath in removed + changed:
+            symbols, generators = self._file_symbols.pop(fpath)
+            old_symbols.extend(symbols)
+            old_generators.extend(generators)
+        for fpath in removed:
+            self._file_order.remove(fpath)
+            cache.discard(fpath)
+
+        new_symbols = []
+        new_generators = []
+        self._prefetch_files(changed + added)
+        for fpath in changed + added:
+            symbols, generators = self._get_file_symbols(fpath)
+            self._file_symbols[fpath] = (symbols, generators)
+            new_symbols.extend(symbols)
+            new_generators.extend(generators)
+        for fpath in added:
+            bisect.insort(self._file_order, fpath)
 
-    def _register_series(self):
-        for generator in self.generators:
-            for iseries in generator.generator.iseries:
-                register_custom_series(iseries)
-
-    def regenerate(self):
+        self.symbols = []
+        self.generators = []
+        for fpath in self._file_order:
+            symbols, generators = self._file_symbols[fpath]
+            self.symbols.extend(symbols)
+            self.generators.extend(generators)
+
+        affected = self._update_index(old_symbols, new_symbols)
+        self._discard_generators(old_generators, new_generators)
+        self._generate_generator_index()
+        self._register_series(new_generators)
+        cache.flush()
+        return affected
+
+    def regenerate(self, incremental=False):
+        """
+        Reload the library from disk.
+
+        If ``incremental`` is True and the library supports it, only the
+        symbol files which have been added, changed or removed since the
+        last regeneration are (re)loaded, and the index is patched in
+        place. In that case, the set of idents whose index entries have
+        changed is returned. A full regeneration returns None.
+        """
+        if incremental and self._files is not None:
+            return self._regenerate_incremental()
+
+        old_generators = self.generators
         self.symbols = []
         self.generators = []
         self.index = {}
 
         self._load_library()
+        self._discard_generators(old_generators, self.generators)
         self._generate_index()
+        self._generate_generator_index()
         self._register_series()
+        get_parse_cache().flush()
 
     @property
     def idents(self):
@@ -120,6 +425,21 @@ class EDASymbolLibraryBase(ValidatableBase):
     def preconform_footprint(self, footprint):
         return footprint
 
+    def _jb_partition(self, jb_tools, device, footprint):
+        """
+        Return the partition of symbols with the given device and
+        footprint, as parsed by ``jb_tools``. Partitions are built on
+        first use and kept until the symbols they contain change.
+        """
+        key = (jb_tools.tclass, device, footprint)
+        partition = self._jb_partitions.get(key)
+        if partition is None:
+            partition = JellybeanPartition(
+                jb_tools, self._jb_index.get((device, footprint), [])
+            )
+            self._jb_partitions[key] = partition
+        return partition
+
     def find_jellybean(self, jb_tools, device, footprint, typevalue, **kwargs):
         footprint = self.preconform_footprint(footprint)
         device = self.preconform_device(device)
@@ -135,26 +455,13 @@ class EDASymbolLibraryBase(ValidatableBase):
                             context={'device': device, 'footprint': footprint},
                             **kwargs)
 
-        candidates = []
-        for symbol in self.symbols:
-            # TODO Don't search _everything_ here
-            # TODO Handle special resistors?
-            if symbol.device == device and symbol.footprint == footprint:
-                try:
-                    sjb = jb_tools.parse(symbol.value)
-                except ParseException:
-                    continue
-                symscore = jb_tools.match(tjb, sjb)
-                if symscore:
-                    candidates.append((symbol, symscore))
-
-        if not len(candidates):
+        # Only candidates with the same primary value can match, so only
+        # those need to be scored.
+        partition = self._jb_partition(jb_tools, device, footprint)
+        symbol = partition.best_match(tjb)
+        if symbol is None:
             raise self._exc_class(typevalue)
-
-        candidates = sorted(candidates, key=lambda c: c[1], reverse=True)
-        maxscore = candidates[0][1]
-        candidates = [x for x in candidates if x[1] == maxscore]
-        return jb_tools.bestmatch(tjb, candidates)
+        return symbol
 
     def find_resistor(self, *args, **kwargs):
         return self.find_jellybean(resistor_tools, *args, **kwargs)
@@ -162,64 +469,333 @@ class EDASymbolLibraryBase(ValidatableBase):
     def find_capacitor(self, *args, **kwargs):
         return self.find_jellybean(capacitor_tools, *args, **kwargs)
 
-    def jb_harmonize(self, item):
-        ident = ident_transform(item.data['device'],
-                                item.data['value'],
-                                item.data['footprint'])
+    def find_nearest_jellybean(self, jb_tools, device, footprint, typevalue,
+                               tolerance=0.1, **kwargs):
+        """
+        Return the symbols whose primary value (resistance, capacitance)
+        is within the fractional ``tolerance`` of ``typevalue``, closest
+        first. Any other parameters provided must be satisfied by the
+        symbols, as they would be by :meth:`find_jellybean`. Values which
+        can't be parsed have no nearest values, and raise the library's
+        exception.
+        """
+        footprint = self.preconform_footprint(footprint)
+        device = self.preconform_device(device)
+        if isinstance(typevalue, str):
+            try:
+                typevalue = jb_tools.defs()[0].typeclass(typevalue)
+            except ParseException:
+                raise self._exc_class(typevalue)
+
+        tjb = jb_tools.pack(typevalue,
+                            context={'device': device, 'footprint': footprint},
+                            **kwargs)
+
+        partition = self._jb_partition(jb_tools, device, footprint)
+        rval = []
+        for symbol, sjb in partition.nearest(typevalue, tolerance):
+            # Match everything except the primary value
+            ptjb = tjb._replace(**{
+                partition.code: getattr(sjb, partition.code)
+            })
+            if jb_tools.match(ptjb, sjb):
+                rval.append(symbol)
+        return rval
+
+    def find_nearest_resistor(self, *args, **kwargs):
+        return self.find_nearest_jellybean(resistor_tools, *args, **kwargs)
+
+    def find_nearest_capacitor(self, *args, **kwargs):
+        return self.find_nearest_jellybean(capacitor_tools, *args, **kwargs)
+
+    def _jb_harmonized(self, device, value, footprint):
+        """
+        Return the harmonized device, value and footprint of a jellybean
+        part, or None if the part is not a jellybean part.
+        """
+        ident = ident_transform(device, value, footprint)
         jb_tools = jb_tools_for_ident(ident)
         if not jb_tools:
-            return item
+            return None
 
-        item.data['footprint'] = self.preconform_footprint(item.data['footprint'])  # noqa
-        item.data['device'] = self.preconform_footprint(item.data['device'])
-        context = {'device': item.data['device'],
-                   'footprint': item.data['footprint']}
+        footprint = self.preconform_footprint(footprint)
+        device = self.preconform_footprint(device)
+        context = {'device': device,
+                   'footprint': footprint}
 
-        params = jb_tools.parse(item.data['value'], context)._asdict()
+        params = jb_tools.parse(value, context)._asdict()
         typevalue = params.pop(jb_tools.defs()[0].code)
         try:
-            jb = self.find_jellybean(jb_tools,
-                                     item.data['device'],
-                                     item.data['footprint'],
-                                     typevalue,
-                                     **params)
-            item.data['value'] = jb.value
+            jb = self.find_jellybean(jb_tools, device, footprint,
+                                     typevalue, **params)
+            value = jb.value
         except self._exc_class:
             pass
+        return device, value, footprint
+
+    @staticmethod
+    def _jb_apply(item, harmonized):
+        if harmonized is not None:
+            item.data['device'], item.data['value'], \
+                item.data['footprint'] = harmonized
         return item
 
+    def jb_harmonize(self, item):
+        harmonized = self._jb_harmonized(item.data['device'],
+                                         item.data['value'],
+                                         item.data['footprint'])
+        return self._jb_apply(item, harmonized)
+
+    def jb_harmonize_many(self, items):
+        """
+        Harmonize a collection of items, such as the lines of a BOM.
+        Each distinct device, value and footprint is only resolved once,
+        and the result is applied to every item which has it.
+        """
+        resolved = {}
+        for item in items:
+            key = (item.data['device'],
+                   item.data['value'],
+                   item.data['footprint'])
+            if key not in resolved:
+                resolved[key] = self._jb_harmonized(*key)
+            self._jb_apply(item, resolved[key])
+        return items
+
+    @staticmethod
+    def _generator_name(generator):
+        return os.path.splitext(generator.gname)[0] + '.gen'
+
+    def _generate_generator_index(self):
+        self._generator_names = [self._generator_name(x)
+                                 for x in self.generators]
+        self._generator_index = {}
+        for name, generator in zip(self._generator_names, self.generators):
+            self._generator_index.setdefault(name, generator)
+        self._ident_generators = None
+
     @property
     def generator_names(self):
-        return [os.path.splitext(x.gname)[0] + '.gen'
-                for x in self.generators]
+        return self._generator_names
 
     def get_generator(self, gen):
-        for generator in self.generators:
-            if os.path.splitext(generator.gname)[0] + '.gen' == gen:
-                return generator
-
-    def get_latest_symbols(self, n=10, include_virtual=False):
-        if include_virtual is False:
-            tlib = (x for x in self.symbols if x.is_virtual is False)
+        return self._generator_index.get(gen)
+
+    def get_ident_generator(self, ident):
+        """
+        Return the generator which produces the (generic) ident, or None
+        if the ident isn't produced by a generator of this library. The
+        reverse index this uses is built on first use.
+        """
+        if self._ident_generators is None:
+            by_gpath = {}
+            for generator in self.generators:
+                by_gpath.setdefault(generator.gpath, generator)
+            ident_generators = {}
+            for symbol in self.symbols:
+                if symbol.is_virtual is not True:
+                    continue
+                generator = by_gpath.get(symbol.gpath)
+                if generator is not None:
+                    ident_generators.setdefault(symbol.ident_generic,
+                                                generator)
+            self._ident_generators = ident_generators
+        return self._ident_generators.get(ident)
+
+    def get_latest_symbols(self, n=10, include_virtual=False,
+                           offset=0, since=None):
+        """
+        Return up to ``n`` symbols, most recently updated first, skipping
+        the first ``offset``. If ``since`` is provided, only symbols
+        updated at or after it are returned. Symbols without a timestamp
+        are returned last.
+        """
+        symbols, keys = self._recent[include_virtual is not False]
+        end = offset + n
+        if since is not None:
+            limit = -arrow.get(since).float_timestamp
+            end = min(end, bisect.bisect_right(keys, limit))
+        return symbols[offset:end]
+
+    def prefetch_sourcing(self, symbols=None, qty=1, workers=8):
+        """
+        Obtain sourcing information for the given symbols, or for all the
+        symbols in the library, for the quantity ``qty``, using a pool of
+        worker threads. Symbols which share an ident are only looked up
+        once. The results are retained in the shared sourcing cache, so
+        subsequent calls to :meth:`sourcing_info_qty` are served from it.
+
+        Returns a dictionary of the sourcing information, keyed by ident.
+        """
+        if symbols is None:
+            symbols = self.symbols
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(symbol.ident, []).append(symbol)
+
+        def _fetch(group):
+            try:
+                return group[0].sourcing_info_qty(qty)
+            except Exception:
+                logger.exception("Error obtaining sourcing information "
+                                 "for {0}".format(group[0].ident))
+                return []
+
+        if ThreadPoolExecutor is None:
+            results = dict(zip(groups.keys(),
+                               map(_fetch, groups.values())))
         else:
-            tlib = self.symbols
-        return sorted(tlib, key=lambda y: y.last_updated, reverse=True)[:n]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(zip(groups.keys(),
+                                   executor.map(_fetch, groups.values())))
+
+        if qty == 1:
+            for ident, group in iteritems(groups):
+                for symbol in group:
+                    if symbol._indicative_sourcing_info is None:
+                        symbol._indicative_sourcing_info = results[ident]
+        return results
+
+    def prerender_images(self, symbols=None, workers=4, background=True):
+        """
+        Render the image representations of the given symbols, or of all
+        the symbols in the library, using a pool of worker threads fed
+        through a bounded queue. Symbols which share a symbol file are
+        only rendered once.
+
+        Returns the thread feeding the workers. Unless ``background`` is
+        False, this returns immediately, and the thread can be joined to
+        wait for rendering to complete.
+        """
+        if symbols is None:
+            symbols = list(self.symbols)
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(symbol.gpath, []).append(symbol)
+
+        queue = Queue(maxsize=2 * workers)
+
+        def _render():
+            while True:
+                group = queue.get()
+                if group is None:
+                    return
+                try:
+                    img_repr_path = group[0].img_repr_path
+                except Exception:
+                    logger.exception("Error rendering image for {0}"
+                                     "".format(group[0].gpath))
+                    continue
+                for symbol in group[1:]:
+                    if symbol._img_repr_path is None:
+                        symbol._img_repr_path = img_repr_path
+
+        def _feed():
+            threads = [Thread(target=_render) for _ in range(workers)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for group in groups.values():
+                queue.put(group)
+            for _ in threads:
+                queue.put(None)
+            for thread in threads:
+                thread.join()
+
+        feeder = Thread(target=_feed)
+        feeder.daemon = True
+        feeder.start()
+        if not background:
+            feeder.join()
+        return feeder
+
+    _audit_header = ['filename', 'status', 'ident', 'device', 'value',
+                     'footprint', 'description', 'path', 'package']
+
+    def _audit_rows(self):
+        yield self._audit_header
+        for symbol in self.symbols:
+            row = [symbol.gname, symbol.status, symbol.ident, symbol.device,
+                   symbol.value, symbol.footprint, symbol.description,
+                   symbol.gpath, symbol.package]
+            yield ['' if x is None else str(x) for x in row]
+
+    @staticmethod
+    def _audit_lines(rows):
+        buf = six.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow(row)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    @staticmethod
+    def _audit_key(row):
+        return row[7], row[2]
+
+    def _export_audit_diff(self, auditfname, difffname):
+        old = {}
+        if os.path.exists(auditfname):
+            with open(auditfname, 'r') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    old[self._audit_key(row)] = row
+
+        def _changes():
+            yield ['change'] + self._audit_header
+            rows = self._audit_rows()
+            next(rows)
+            for row in rows:
+                orow = old.pop(self._audit_key(row), None)
+                if orow is None:
+                    yield ['added'] + row
+                elif orow != row:
+                    yield ['modified'] + row
+            for orow in old.values():
+                yield ['removed'] + orow
+
+        outf = VersionedOutputFile(difffname)
+        for line in self._audit_lines(_changes()):
+            outf.write(line.encode('utf-8'))
+        outf.close()
+
+    def export_audit(self, name, diff=False):
+        """
+        Write out the audit of the library to ``esymlib-<name>.audit.csv``
+        in the audit folder. The rows are streamed twice, once to hash
+        them and, if the hash differs from that of the existing audit,
+        again to write them out. Nothing is written if the audit has not
+        changed.
 
-    def export_audit(self, name):
+        If ``diff`` is True, the rows which were added, removed or
+        modified since the previous audit, keyed by path and ident, are
+        also written to ``esymlib-<name>.audit.diff.csv``.
+
+        Returns True if a new audit was written.
+        """
         auditfname = os.path.join(
             AUDIT_PATH, 'esymlib-{0}.audit.csv'.format(name)
         )
-        outf = VersionedOutputFile(auditfname)
-        outw = csv.writer(outf)
-        outw.writerow(['filename', 'status', 'ident', 'device', 'value',
-                       'footprint', 'description', 'path', 'package'])
-        for symbol in self.symbols:
-            outw.writerow(
-                [symbol.gname, symbol.status, symbol.ident, symbol.device,
-                 symbol.value, symbol.footprint, symbol.description,
-                 symbol.gpath, symbol.package]
+        hasher = hashlib.sha1()
+        for line in self._audit_lines(self._audit_rows()):
+            hasher.update(line.encode('utf-8'))
+        if os.path.exists(auditfname) and \
+                get_content_hash(auditfname) == hasher.hexdigest():
+            return False
+
+        if diff:
+            difffname = os.path.join(
+                AUDIT_PATH, 'esymlib-{0}.audit.diff.csv'.format(name)
             )
+            self._export_audit_diff(auditfname, difffname)
+
+        outf = VersionedOutputFile(auditfname)
+        for line in self._audit_lines(self._audit_rows()):
+            outf.write(line.encode('utf-8'))
         outf.close()
+        return True
 
     def _validate(self):
         pass
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+EDA Symbol Library Jellybean Partitions
+---------------------------------------
+
+If NumPy is installed, the parameters of the symbols in each partition
+are also kept as columns, and large candidate sets are scored in a single
+array operation instead of by calling ``jb_tools.match`` per candidate.
+"""
+
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from tendril.utils.types import ParseException
+from tendril.utils.types.unitbase import NumericalUnitBase
+
+
+class JellybeanPartition(object):
+    # Candidate sets smaller than this are scored in Python, where the
+    # overhead of the array operations isn't worth it.
+    vector_threshold = 32
+
+    def __init__(self, jb_tools, symbols):
+        """
+        The symbols of a library which share a device and footprint,
+        each paired with its value as parsed by ``jb_tools``.
+
+        If the primary component of the jellybean type (resistance,
+        capacitance) is numerical, the entries are also kept sorted by
+        that value, so that exact and nearest value lookups can be done
+        by binary search. Entries with equal values retain the order in
+        which the symbols were provided.
+        """
+        self._jb_tools = jb_tools
+        self._primary = jb_tools.defs()[0]
+        self.entries = []
+        for symbol in symbols:
+            try:
+                self.entries.append((symbol, jb_tools.parse(symbol.value)))
+            except ParseException:
+                continue
+
+        self._keys = None
+        self._sorted = None
+        if issubclass(self._primary.typeclass, NumericalUnitBase):
+            keyed = sorted(((float(self._value(x)), x) for x in self.entries),
+                           key=lambda y: y[0])
+            self._keys = [x[0] for x in keyed]
+            self._sorted = [x[1] for x in keyed]
+        self._columns = None
+
+    @property
+    def _rows(self):
+        if self._keys is None:
+            return self.entries
+        return self._sorted
+
+    @property
+    def code(self):
+        return self._primary.code
+
+    def _value(self, entry):
+        return getattr(entry[1], self._primary.code)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def _exact_range(self, value):
+        if self._keys is None:
+            return 0, len(self.entries)
+        fvalue = float(value)
+        return (bisect_left(self._keys, fvalue),
+                bisect_right(self._keys, fvalue))
+
+    def exact(self, value):
+        """
+        Return the entries whose primary value may equal ``value``. For
+        non-numerical types, this is all of the entries.
+        """
+        lo, hi = self._exact_range(value)
+        return self._rows[lo:hi]
+
+    def _build_columns(self):
+        # Numerical components are kept as floats, with NaN for missing
+        # values. String components are kept as integer codes, with -1 for
+        # missing values. Anything else can't be vectorized.
+        columns = []
+        for component in self._jb_tools.defs():
+            values = [getattr(x[1], component.code) for x in self._rows]
+            if issubclass(component.typeclass, NumericalUnitBase):
+                column = numpy.array(
+                    [numpy.nan if x is None else float(x) for x in values],
+                    dtype=float
+                )
+                columns.append((component, column, None))
+            elif component.typeclass is str and \
+                    component.criteria == 'EQUAL':
+                codes = {}
+                column = numpy.array(
+                    [-1 if x is None else codes.setdefault(x, len(codes))
+                     for x in values],
+                    dtype=numpy.int64
+                )
+                columns.append((component, column, codes))
+            else:
+                return False
+        return columns
+
+    def _vector_scores(self, tjb, lo, hi):
+        """
+        Return the scores of the rows from ``lo`` to ``hi`` against the
+        packed jellybean ``tjb``, as ``jb_tools.match`` would compute
+        them, or None if the partition can't be scored as arrays.
+        """
+        if self._columns is None:
+            self._columns = self._build_columns()
+        if self._columns is False:
+            return None
+        scores = numpy.zeros(hi - lo, dtype=numpy.int64)
+        valid = numpy.ones(hi - lo, dtype=bool)
+        for component, column, codes in self._columns:
+            tvalue = getattr(tjb, component.code)
+            if tvalue is None:
+                continue
+            if not isinstance(tvalue, component.typeclass):
+                tvalue = component.typeclass(tvalue)
+            column = column[lo:hi]
+            if codes is None:
+                tvalue = float(tvalue)
+                valid &= ~numpy.isnan(column)
+            else:
+                tvalue = codes.get(tvalue, -2)
+                valid &= column != -1
+            equal = column == tvalue
+            if component.criteria == 'EQUAL':
+                valid &= equal
+                scores += 2
+            elif component.criteria == 'ATLEAST':
+                valid &= column >= tvalue
+                scores += numpy.where(equal, 2, 1)
+            elif component.criteria == 'ATMOST':
+                valid &= column <= tvalue
+                scores += numpy.where(equal, 2, 1)
+        return numpy.where(valid, scores, 0)
+
+    def best_match(self, tjb):
+        """
+        Return the symbol which best matches the packed jellybean
+        ``tjb``, or None if no symbol matches it.
+        """
+        lo, hi = self._exact_range(getattr(tjb, self.code))
+        rows = self._rows
+        scores = None
+        if numpy is not None and hi - lo >= self.vector_threshold:
+            scores = self._vector_scores(tjb, lo, hi)
+        candidates = []
+        if scores is not None:
+            if len(scores) and scores.max():
+                for idx in numpy.flatnonzero(scores == scores.max()):
+                    candidates.append((rows[lo + idx][0],
+                                       int(scores[idx])))
+        else:
+            # TODO Handle special resistors?
+            for symbol, sjb in rows[lo:hi]:
+                symscore = self._jb_tools.match(tjb, sjb)
+                if symscore:
+                    candidates.append((symbol, symscore))
+        if not len(candidates):
+            return None
+        maxscore = max(x[1] for x in candidates)
+        candidates = [x for x in candidates if x[1] == maxscore]
+        return self._jb_tools.bestmatch(tjb, candidates)
+
+    def nearest(self, value, tolerance):
+        """
+        Return the entries whose primary value is within the fractional
+        ``tolerance`` of ``value``, closest first.
+        """
+        if self._keys is None:
+            raise TypeError("Nearest value lookups are not supported for "
+                            "{0}".format(self._primary.typeclass.__name__))
+        fvalue = float(value)
+        lo = bisect_left(self._keys, fvalue * (1 - tolerance))
+        hi = bisect_right(self._keys, fvalue * (1 + tolerance))
+        return sorted(self._sorted[lo:hi],
+                      key=lambda x: abs(float(self._value(x)) - fvalue))
+
+
+def load(manager):
+    pass
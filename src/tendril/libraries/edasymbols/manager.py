@@ -19,34 +19,78 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import sys
 import importlib
+import threading
+from itertools import chain
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport. Audits are then exported
+    # serially.
+    ThreadPoolExecutor = None
 from six import iteritems
 
 from tendril.config import EDA_LIBRARY_FUSION
 from tendril.config import EDA_LIBRARY_PRIORITY
+from tendril.config import EDA_LIBRARY_LAZY
+
+from tendril.conventions.electronics import ident_transform
+from tendril.conventions.electronics import resistor_tools
+from tendril.conventions.electronics import capacitor_tools
 
 from tendril.validation.base import ValidationContext
+from tendril.utils.types import ParseException
 from tendril.utils.versions import get_namespace_package_names
 from tendril.utils import log
 logger = log.get_logger(__name__, log.DEBUG)
 
 
 class EDALibraryManager(object):
-    def __init__(self, prefix):
+    _jb_finders = {
+        'find_resistor': resistor_tools,
+        'find_capacitor': capacitor_tools,
+    }
+
+    def __init__(self, prefix, lazy=None):
         self._prefix = prefix
         self._validation_context = ValidationContext(self.__module__)
         self._index = {}
+        self._library_idents = {}
+        self._jb_index = {}
         self._libraries = {}
         self._exc_classes = {}
-        self._load_libraries()
-        self._generate_index()
+        self._loaded = False
+        self._load_lock = threading.RLock()
+        self._modules = self._discover_libraries()
+        if lazy is None:
+            lazy = EDA_LIBRARY_LAZY
+        if not lazy:
+            self._ensure_loaded()
+
+    def _discover_libraries(self):
+        # The manager replaces the package in sys.modules, so it carries
+        # the package's __path__ and __spec__ for library modules to
+        # remain importable.
+        ns_module = importlib.import_module(self._prefix)
+        self.__path__ = ns_module.__path__
+        self.__spec__ = getattr(ns_module, '__spec__', None)
+        return [m_name for m_name in get_namespace_package_names(self._prefix)
+                if m_name != __name__]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._load_libraries()
+            self._generate_index()
+            self._loaded = True
 
     def _load_libraries(self):
         logger.debug("Loading EDA library modules from {0}".format(self._prefix))
-        modules = list(get_namespace_package_names(self._prefix))
-        for m_name in modules:
-            if m_name == __name__:
-                continue
+        for m_name in self._modules:
             m = importlib.import_module(m_name)
             m.load(self)
         logger.debug("Done loading EDA library modules from {0}".format(self._prefix))
@@ -59,35 +103,101 @@ class EDALibraryManager(object):
         self._exc_classes[name] = exc_class
 
     def __getattr__(self, item):
+        if item.startswith('__'):
+            raise AttributeError(item)
+        self._ensure_loaded()
         if item in self._libraries.keys():
             return self._libraries[item]
         if item in self._exc_classes.keys():
             return self._exc_classes[item]
+        m_name = '{0}.{1}'.format(self._prefix, item)
+        if m_name in sys.modules:
+            return sys.modules[m_name]
         raise AttributeError('No attribute {0} in {1}!'
                              ''.format(item, self.__class__.__name__))
 
-    def export_audits(self):
-        for name, library in iteritems(self._libraries):
-            library.export_audit(name)
+    def export_audits(self, diff=False):
+        self._ensure_loaded()
+        libraries = list(self._libraries.items())
+        if not libraries:
+            return
+        if ThreadPoolExecutor is None:
+            for name, library in libraries:
+                library.export_audit(name, diff=diff)
+            return
+        with ThreadPoolExecutor(max_workers=len(libraries)) as executor:
+            futures = [executor.submit(library.export_audit, name, diff=diff)
+                       for name, library in libraries]
+            for future in futures:
+                future.result()
 
-    def regenerate(self):
+    def regenerate(self, incremental=False):
+        if not self._loaded:
+            self._ensure_loaded()
+            return
+        affected = set()
+        fused = self._fused_libraries()
         for name, library in iteritems(self._libraries):
-            log.info("Regenerating EDA library '{0}'".format(name))
-            library.regenerate()
-        self._generate_index()
+            logger.info("Regenerating EDA library '{0}'".format(name))
+            changes = library.regenerate(incremental=incremental)
+            if name not in fused:
+                continue
+            if changes is None:
+                # The library was rebuilt from scratch, so any of the
+                # idents it used to provide or now provides may differ.
+                changes = self._library_idents.get(name, frozenset())
+                changes = changes.union(library.index.keys())
+            affected.update(changes)
+        self._update_index(affected)
 
-    def _generate_index(self):
-        self.index = {}
-        if not EDA_LIBRARY_FUSION:
-            self.index = self._libraries[EDA_LIBRARY_PRIORITY[0]].index
+    @staticmethod
+    def _fused_libraries():
+        if EDA_LIBRARY_FUSION:
+            return EDA_LIBRARY_PRIORITY
+        return EDA_LIBRARY_PRIORITY[:1]
 
-        for lname in EDA_LIBRARY_PRIORITY:
+    def _generate_index(self):
+        self._jb_index = {}
+        # The fused index holds a tuple of symbols for each ident, in
+        # library priority order. It is never modified once published, so
+        # the libraries' own index lists are never aliased or extended.
+        contributions = {}
+        self._library_idents = {}
+        for lname in self._fused_libraries():
             library = self._libraries[lname]
+            self._library_idents[lname] = frozenset(library.index.keys())
             for ident, symbols in iteritems(library.index):
-                if ident in self.index:
-                    self.index[ident].extend(symbols)
-                else:
-                    self.index[ident] = symbols
+                contributions.setdefault(ident, []).append(symbols)
+        self._index = {ident: tuple(chain.from_iterable(parts))
+                       for ident, parts in iteritems(contributions)}
+
+    def _update_index(self, idents):
+        # Changes are applied to a copy of the index, which then replaces
+        # it. Readers see either the old or the new index, never a mix.
+        if not idents:
+            return
+        self._jb_index = {}
+        lnames = self._fused_libraries()
+        index = dict(self._index)
+        for ident in idents:
+            symbols = tuple(chain.from_iterable(
+                self._libraries[lname].index.get(ident, ())
+                for lname in lnames
+            ))
+            if symbols:
+                index[ident] = symbols
+            else:
+                index.pop(ident, None)
+        for lname in lnames:
+            self._library_idents[lname] = frozenset(
+                self._libraries[lname].index.keys()
+            )
+        self._index = index
+
+    @property
+    def index(self):
+        self._ensure_loaded()
+        return self._index
 
     @property
     def idents(self):
@@ -107,12 +217,71 @@ class EDALibraryManager(object):
             if not get_all:
                 return self.index[ident][0]
             else:
-                return self.index[ident]
+                return list(self.index[ident])
 
         raise self.nosymbolexception(
             'Symbol {0} not found in fused library'.format(ident))
 
+    def _jb_members(self, jb_tools, device, footprint):
+        """
+        Return the jellybean partitions of the fused libraries for the
+        given device and footprint, in library priority order. Each is
+        paired with its library and the device and footprint as conformed
+        by that library. These are kept until the fused index changes.
+        """
+        key = (jb_tools.tclass, device, footprint)
+        members = self._jb_index.get(key)
+        if members is None:
+            members = []
+            for lname in self._fused_libraries():
+                library = self._libraries[lname]
+                cdevice = library.preconform_device(device)
+                cfootprint = library.preconform_footprint(footprint)
+                partition = library._jb_partition(jb_tools, cdevice,
+                                                  cfootprint)
+                members.append((library, cdevice, cfootprint, partition))
+            self._jb_index[key] = members
+        return members
+
+    def _find_jellybean(self, jb_tools, device, footprint, typevalue,
+                        **kwargs):
+        members = self._jb_members(jb_tools, device, footprint)
+
+        if isinstance(typevalue, str):
+            try:
+                typevalue = jb_tools.defs()[0].typeclass(typevalue)
+            except ParseException:
+                for library, cdevice, cfootprint, _ in members:
+                    tident = ident_transform(cdevice, typevalue, cfootprint)
+                    if library.is_recognized(tident):
+                        return library.index[tident][0]
+                raise self.nosymbolexception(device, footprint, typevalue)
+
+        # Libraries which conform the device and footprint identically
+        # share the packed target.
+        targets = {}
+        for library, cdevice, cfootprint, partition in members:
+            if not len(partition):
+                continue
+            tjb = targets.get((cdevice, cfootprint))
+            if tjb is None:
+                tjb = jb_tools.pack(
+                    typevalue,
+                    context={'device': cdevice, 'footprint': cfootprint},
+                    **kwargs
+                )
+                targets[(cdevice, cfootprint)] = tjb
+            symbol = partition.best_match(tjb)
+            if symbol is not None:
+                return symbol
+        raise self.nosymbolexception(device, footprint, typevalue)
+
     def find_jellybean(self, finder, *args, **kwargs):
+        self._ensure_loaded()
+        jb_tools = self._jb_finders.get(finder)
+        if jb_tools is not None:
+            return self._find_jellybean(jb_tools, *args, **kwargs)
+
         if not EDA_LIBRARY_FUSION:
             return getattr(self._libraries[
                 EDA_LIBRARY_PRIORITY[0]
@@ -132,9 +301,39 @@ class EDALibraryManager(object):
     def find_capacitor(self, *args, **kwargs):
         return self.find_jellybean('find_capacitor', *args, **kwargs)
 
+    def find_nearest_jellybean(self, finder, *args, **kwargs):
+        self._ensure_loaded()
+        if not EDA_LIBRARY_FUSION:
+            return getattr(self._libraries[
+                EDA_LIBRARY_PRIORITY[0]
+            ], finder)(*args, **kwargs)
+
+        for lname in EDA_LIBRARY_PRIORITY:
+            library = self._libraries[lname]
+            rval = getattr(library, finder)(*args, **kwargs)
+            if rval:
+                return rval
+        return []
+
+    def find_nearest_resistor(self, *args, **kwargs):
+        return self.find_nearest_jellybean('find_nearest_resistor',
+                                           *args, **kwargs)
+
+    def find_nearest_capacitor(self, *args, **kwargs):
+        return self.find_nearest_jellybean('find_nearest_capacitor',
+                                           *args, **kwargs)
+
     def jb_harmonize(self, item):
+        self._ensure_loaded()
         return self._libraries[EDA_LIBRARY_PRIORITY[0]].jb_harmonize(item)
 
+    def jb_harmonize_many(self, items):
+        self._ensure_loaded()
+        return self._libraries[
+            EDA_LIBRARY_PRIORITY[0]
+        ].jb_harmonize_many(items)
+
     @property
     def nosymbolexception(self):
+        self._ensure_loaded()
         return self._exc_classes['EDASymbolNotFound']
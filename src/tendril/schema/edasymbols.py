@@ -25,12 +25,20 @@ EDA Symbol Generator Schema
 
 import os
 import inspect
+import hashlib
+import threading
 import iec60063
+from bisect import bisect_right
+from itertools import chain
 from six import iteritems
+from six.moves import collections_abc
 from decimal import Decimal
+from decimal import InvalidOperation
 
 from tendril.conventions import electronics
 from tendril.conventions.series import CustomValueSeries
+from tendril.conventions.series import custom_series
+from tendril.conventions.series import register_custom_series
 
 from tendril.schema.base import SchemaControlledYamlFile
 from tendril.schema.base import NakedSchemaObject
@@ -52,6 +60,306 @@ template_path = os.path.normpath(os.path.join(
 )
 
 
+class SeriesValues(collections_abc.Sequence):
+    def __init__(self, series, ostrs, start=None, end=None):
+        """
+        The values of a standard series over a range, as would be
+        generated by :func:`iec60063.gen_vals`, computed on demand from
+        their position in the series rather than materialized.
+
+        Values are ordered by order string, then decade, then position
+        in the series. ``start`` and ``end`` are matched as strings and
+        are both included. If ``start`` isn't part of the series, there
+        are no values. If ``end`` isn't reached, the values run to the
+        end of the last order string.
+        """
+        if isinstance(series, str):
+            series = iec60063.get_series(series)
+        if isinstance(ostrs, str):
+            ostrs = iec60063.get_ostr(ostrs)
+        # Values are formatted on demand until the sequence is iterated
+        # over, after which they're kept.
+        self._materialized = None
+        self._series = list(series)
+        self._ostrs = list(ostrs)
+        self._series_index = {}
+        for idx, value in enumerate(self._series):
+            self._series_index.setdefault(value, idx)
+        self._decades = 3
+        self._span = self._decades * len(self._series)
+        total = len(self._ostrs) * self._span
+
+        if start is None:
+            self._start = 0
+        else:
+            self._start = self._locate(start)
+        if self._start is None:
+            self._start, self._end = 0, 0
+            return
+        self._end = total
+        if end is not None:
+            pos = self._locate(end)
+            if pos is not None and pos >= self._start:
+                self._end = pos + 1
+
+    @staticmethod
+    def _vfmt(d):
+        if d == d.to_integral():
+            return str(d.quantize(Decimal(1)))
+        return str(d.normalize())
+
+    def _format(self, pos):
+        ostr, pos = divmod(pos, self._span)
+        decade, idx = divmod(pos, len(self._series))
+        return self._vfmt(self._series[idx] * (10 ** decade)) + \
+            self._ostrs[ostr]
+
+    def _locate(self, valstr):
+        # Return the first position at which valstr would be generated,
+        # or None if it never would be.
+        for oidx, ostr in enumerate(self._ostrs):
+            if not valstr.endswith(ostr):
+                continue
+            try:
+                num = Decimal(valstr[:len(valstr) - len(ostr)])
+            except InvalidOperation:
+                continue
+            for decade in range(self._decades):
+                idx = self._series_index.get(num / (10 ** decade))
+                if idx is None:
+                    continue
+                pos = oidx * self._span + decade * len(self._series) + idx
+                if self._format(pos) == valstr:
+                    return pos
+        return None
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, item):
+        if self._materialized is not None:
+            rval = self._materialized[item]
+            if isinstance(item, slice):
+                return list(rval)
+            return rval
+        if isinstance(item, slice):
+            return [self[x] for x in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return self._format(self._start + item)
+
+    def __iter__(self):
+        if self._materialized is None:
+            self._materialized = tuple(
+                self._format(pos) for pos in range(self._start, self._end)
+            )
+        return iter(self._materialized)
+
+    def __contains__(self, valstr):
+        if not isinstance(valstr, str):
+            return False
+        pos = self._locate(valstr)
+        return pos is not None and self._start <= pos < self._end
+
+    def index(self, valstr, *args):
+        if valstr not in self:
+            raise ValueError(valstr)
+        return self._locate(valstr) - self._start
+
+
+_series_values = {}
+_series_values_lock = threading.Lock()
+
+
+def get_series_values(series, ostrs, start=None, end=None):
+    """
+    Return the :class:`SeriesValues` for the given series, order strings
+    and range. These are shared across the process, so generators using
+    the same range also share the expanded values.
+    """
+    key = (series if isinstance(series, str) else tuple(series),
+           ostrs if isinstance(ostrs, str) else tuple(ostrs),
+           start, end)
+    values = _series_values.get(key)
+    if values is None:
+        with _series_values_lock:
+            values = _series_values.get(key)
+            if values is None:
+                values = SeriesValues(series, ostrs, start=start, end=end)
+                _series_values[key] = values
+    return values
+
+
+class ConstructedValues(collections_abc.Sequence):
+    def __init__(self, values, constructor, components):
+        """
+        The part names constructed from a sequence of primary values
+        (resistances, capacitances) and a fixed set of other components,
+        built on demand.
+
+        Since the primary value is the first element of the part name,
+        membership is decided by looking up the head of the part name in
+        the underlying values and reconstructing the part name from it.
+        """
+        self._values = values
+        self._constructor = constructor
+        self._components = components
+
+    def _construct(self, value):
+        return self._constructor(value, **self._components)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._construct(x) for x in self._values[item]]
+        return self._construct(self._values[item])
+
+    def __iter__(self):
+        for value in self._values:
+            yield self._construct(value)
+
+    def __contains__(self, pname):
+        if not isinstance(pname, str):
+            return False
+        head = pname.split('/', 1)[0]
+        if head not in self._values:
+            return False
+        return self._construct(head) == pname
+
+
+class GeneratedValues(collections_abc.Sequence):
+    def __init__(self, segments=None):
+        """
+        The values of a generator, as the concatenation of a number of
+        segments. Segments may be lists, or lazy sequences such as
+        :class:`ConstructedValues`.
+        """
+        self._segments = []
+        self._offsets = []
+        self._len = 0
+        for segment in segments or []:
+            self.add_segment(segment)
+
+    def add_segment(self, segment):
+        if not len(segment):
+            return
+        self._segments.append(segment)
+        self._offsets.append(self._len)
+        self._len += len(segment)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[x] for x in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        sidx = bisect_right(self._offsets, item) - 1
+        return self._segments[sidx][item - self._offsets[sidx]]
+
+    def __iter__(self):
+        return chain.from_iterable(self._segments)
+
+    def __contains__(self, value):
+        return any(value in segment for segment in self._segments)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, GeneratedValues)):
+            return len(self) == len(other) and \
+                all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        rval = self.__eq__(other)
+        if rval is NotImplemented:
+            return rval
+        return not rval
+
+    __hash__ = None
+
+
+class IndexedValueSeries(CustomValueSeries):
+    def __init__(self, *args, **kwargs):
+        """
+        A :class:`CustomValueSeries` which can be filled in bulk, and
+        which keeps a reverse index from part names to type values, so
+        that :meth:`get_type_value` does not need to scan the series.
+        """
+        super(IndexedValueSeries, self).__init__(*args, **kwargs)
+        self._type_values = {}
+        self._digest = None
+
+    def add_value(self, type_value, value):
+        self.add_values([(type_value, value)])
+
+    def add_values(self, items):
+        typeclass = self._typeclass
+        values = self._values
+        type_values = self._type_values
+        for type_value, value in items:
+            if not isinstance(type_value, typeclass):
+                type_value = typeclass(type_value)
+            type_value = str(type_value)
+            values[type_value] = value
+            type_values.setdefault(value, type_value)
+        self._digest = None
+
+    def get_type_value(self, value):
+        type_value = self._type_values.get(value)
+        if type_value is None:
+            return None
+        return self._typeclass(type_value)
+
+    @property
+    def digest(self):
+        """
+        A hash of the definition and the content of the series.
+        """
+        if self._digest is None:
+            content = (
+                self._name, self._stype, self._device, self._footprint,
+                self._desc, sorted((k, str(v))
+                                   for k, v in iteritems(self._aparams)),
+                sorted(iteritems(self._values)),
+            )
+            self._digest = hashlib.sha1(
+                repr(content).encode('utf-8')
+            ).hexdigest()
+        return self._digest
+
+
+_registered_series = {}
+_registration_lock = threading.Lock()
+
+
+def register_series(iseries):
+    """
+    Register the given series as custom series, skipping those which
+    are already registered with the same content. Returns the number of
+    series actually registered.
+    """
+    count = 0
+    with _registration_lock:
+        for series in iseries:
+            registered = custom_series.get(series.name)
+            if registered is series:
+                continue
+            if registered is not None and \
+                    _registered_series.get(series.name) == series.digest:
+                continue
+            register_custom_series(series)
+            _registered_series[series.name] = series.digest
+            count += 1
+    return count
+
+
 class CompositeSeriesDefinition(NakedSchemaObject):
     def elements(self):
         e = super(CompositeSeriesDefinition, self).elements()
@@ -108,7 +416,7 @@ class ValueGeneratorDefinition(NakedSchemaObject):
     @property
     def values(self):
         if self.std == 'iec60063':
-            return iec60063.gen_vals(self.series, self._ostrs,
+            return get_series_values(self.series, self._ostrs,
                                      start=self.start, end=self.end)
 
     def __repr__(self):
@@ -213,10 +521,10 @@ class EDASymbolGeneratorBase(SchemaControlledYamlFile):
         super(EDASymbolGeneratorBase, self).__init__(genpath, *args, **kwargs)
         self._process_specialized()
 
-        self.composite_series = None
-        self.values = []
+        self._composite_series_obj = None
+        self._iseries = None
+        self.values = GeneratedValues()
         self.igen = []
-        self.iseries = []
 
         self._get_data()
 
@@ -274,67 +582,96 @@ class EDASymbolGeneratorBase(SchemaControlledYamlFile):
         for key, policy in iteritems(elements):
             self._process_element(key, policy)
 
-    def _get_data_rc(self):
+    def _rc_type(self):
         if self.type == 'resistor':
-            svattr = 'resistances'
-            constructor = electronics.construct_resistor
+            return 'resistances', electronics.construct_resistor
         elif self.type == 'capacitor':
-            svattr = 'capacitances'
-            constructor = electronics.construct_capacitor
+            return 'capacitances', electronics.construct_capacitor
         else:
             raise Exception
 
-        tsymbol = self.symbol_template()
+    def _get_data_rc(self):
+        svattr, constructor = self._rc_type()
 
         # Specifically defined and qualified part names
         if getattr(self, svattr):
-            self.values.extend(getattr(self, svattr).content)
+            self.values.add_segment(list(getattr(self, svattr).content))
+
+        # Generator series. Part names are only constructed when they
+        # are asked for.
+        if self.generators:
+            for generator in self.generators:
+                self.igen.append(generator)
+                self.values.add_segment(ConstructedValues(
+                    generator.values, constructor, generator.components
+                ))
+
+        # Custom series
+        if self.custom_series:
+            for name, series in iteritems(self.custom_series.content):
+                assert series.type == self.type
+                self.values.add_segment(list(series.partnames))
+
+    def _build_series(self):
+        iseries = []
+        if self.type not in ['resistor', 'capacitor']:
+            return iseries
+        _, constructor = self._rc_type()
+        tsymbol = self.symbol_template()
 
         # Composite of all standard (generator) series
         if self._composite_series is not None:
-            self.composite_series = CustomValueSeries(
+            composite_series = IndexedValueSeries(
                 self._composite_series.name, self.type,
                 device=tsymbol.device, footprint=tsymbol.footprint
             )
-
-        # Generator series
-        if self.generators:
-            for generator in self.generators:
-                self.igen.append(generator)
-                for val in generator.values:
-                    pval = constructor(val, **generator.components)
-                    self.values.append(pval)
-                    if self.composite_series:
-                        self.composite_series.add_value(val, pval)
-
-        if self.composite_series:
-            self.iseries.append(self.composite_series)
+            composite_series.add_values(
+                (val, constructor(val, **generator.components))
+                for generator in self.generators or []
+                for val in generator.values
+            )
+            self._composite_series_obj = composite_series
+            iseries.append(composite_series)
 
         # Custom series
         if self.custom_series:
             for name, series in iteritems(self.custom_series.content):
-                assert series.type == self.type
-                iseries = CustomValueSeries(
+                iseries_ = IndexedValueSeries(
                     name, series.type,
                     device=tsymbol.device, footprint=tsymbol.footprint
                 )
-                iseries._desc = series.desc
-                iseries._aparams = series.components
-                for type_val, val in iteritems(series.values):
-                    iseries.add_value(type_val, val)
-                self.iseries.append(iseries)
-                self.values.extend(series.partnames)
+                iseries_._desc = series.desc
+                iseries_._aparams = series.components
+                iseries_.add_values(iteritems(series.values))
+                iseries.append(iseries_)
+        return iseries
+
+    @property
+    def iseries(self):
+        # The value series are only built when they are asked for, since
+        # that requires constructing every generated part name.
+        if self._iseries is None:
+            self._iseries = self._build_series()
+        return self._iseries
+
+    @property
+    def composite_series(self):
+        # The composite series object is created by _build_series().
+        if self._iseries is None:
+            self._iseries = self._build_series()
+        return self._composite_series_obj
 
     def _get_data_wire(self):
-        for gauge in self.gauges:
-            for color in self.colors:
-                self.values.append('{0} {1}'.format(gauge, color))
+        self.values.add_segment([
+            '{0} {1}'.format(gauge, color)
+            for gauge in self.gauges for color in self.colors
+        ])
 
     def _get_data(self):
-        self.values = []
+        self.values = GeneratedValues()
         # Spwcifically defined and unqualified part names
         if hasattr(self, '_values') and self._values:
-            self.values.extend(self._values.content)
+            self.values.add_segment(list(self._values.content))
 
         if self.type == 'simple':
             return
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+
+# The tests construct their own libraries, and never need those of the
+# instance to be loaded.
+os.environ.setdefault('TENDRIL_EDA_LIBRARY_LAZY', '1')
+
+import importlib                                    # noqa: E402
+import pytest                                       # noqa: E402
+
+from tendril.entities.edasymbols import cache      # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def edasymbol_caches(monkeypatch):
+    """
+    Give each test its own in-memory parse cache and sourcing cache, no
+    image cache and an empty generator cache, instead of those of the
+    instance.
+    """
+    monkeypatch.setattr(cache, '_parse_cache', cache.EDASymbolParseCache())
+    monkeypatch.setattr(cache, '_image_cache', None)
+    monkeypatch.setattr(cache, 'EDA_SYMBOL_IMAGE_CACHE', None)
+    monkeypatch.setattr(cache, '_sourcing_cache', None)
+    cache.get_generator_cache().clear()
+    yield
+    cache.get_generator_cache().clear()
+
+
+@pytest.fixture
+def library_manager(monkeypatch):
+    """
+    Return a function which builds a library manager over the libraries
+    it is given, named ``first`` and ``second`` in order of priority,
+    instead of those of the instance.
+    """
+    # Attribute lookups on tendril.libraries.edasymbols load the libraries.
+    base = importlib.import_module('tendril.libraries.edasymbols.base')
+    manager = importlib.import_module('tendril.libraries.edasymbols.manager')
+    monkeypatch.setattr(manager.EDALibraryManager, '_discover_libraries',
+                        lambda self: [])
+    monkeypatch.setattr(manager, 'EDA_LIBRARY_PRIORITY', ['first', 'second'])
+
+    def _build(first, second, fusion=True):
+        monkeypatch.setattr(manager, 'EDA_LIBRARY_FUSION', fusion)
+        rval = manager.EDALibraryManager('tests.edasymbols', lazy=True)
+        base.load(rval)
+        rval.install_library('first', first)
+        rval.install_library('second', second)
+        rval._generate_index()
+        rval._loaded = True
+        return rval
+    return _build
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Minimal EDA symbol, generator and library classes, and writers for their
+symbol files, for the tests and the benchmarks. Each symbol file holds
+one ``key=value`` line per field. Generator symbols have the status
+``Generator`` and a sibling ``.gen.yaml`` file.
+"""
+
+
+import os
+
+from tendril.entities.edasymbols.base import EDASymbolBase
+from tendril.schema.edasymbols import EDASymbolGeneratorBase
+from tendril.libraries.edasymbols.base import EDASymbolLibraryBase
+
+
+class KVSymbolGenerator(EDASymbolGeneratorBase):
+    def symbol_template(self):
+        return KVSymbol(os.path.join(os.path.dirname(self.path),
+                                     self.symbolfile))
+
+
+class KVSymbol(EDASymbolBase):
+    __slots__ = ('fpath',)
+    _gen_class = KVSymbolGenerator
+    _attrs = {'datasheet': '_datasheet', 'manufacturer': '_manufacturer'}
+
+    def __init__(self, fpath):
+        self.fpath = fpath
+        super(KVSymbol, self).__init__()
+
+    def _get_sym(self):
+        with open(self.fpath) as f:
+            for line in f:
+                key, value = line.rstrip('\n').split('=', 1)
+                setattr(self, self._attrs.get(key, key), value or None)
+
+    @property
+    def gname(self):
+        return os.path.basename(self.fpath)
+
+    @property
+    def gpath(self):
+        return self.fpath
+
+
+class KVSymbolLibrary(EDASymbolLibraryBase):
+    _symbol_class = KVSymbol
+    _generator_class = KVSymbolGenerator
+    _symbol_ext = '.sym'
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+
+class Item(object):
+    # Stands in for a line of a BOM, as harmonized by the libraries.
+    def __init__(self, device, value, footprint):
+        self.data = {'device': device, 'value': value,
+                     'footprint': footprint}
+
+
+def write_symbol(fpath, device, value, footprint, status='Active',
+                 last_updated='2019-01-01T00:00:00', **fields):
+    folder = os.path.dirname(fpath)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    fields.update({'device': device, 'value': value or '',
+                   'footprint': footprint, 'status': status,
+                   'last_updated': last_updated})
+    with open(fpath, 'w') as f:
+        for key in sorted(fields.keys()):
+            f.write('{0}={1}\n'.format(key, fields[key]))
+
+
+def write_generator(fpath, device, footprint, gtype, series, start, end,
+                    last_updated='2019-01-01T00:00:00', symbol_fields=None,
+                    **params):
+    """
+    Write a generator symbol to ``fpath``, with a ``.gen.yaml`` file
+    which generates the values of the given IEC60063 series. Additional
+    fields of the generator symbol itself are given in ``symbol_fields``.
+    """
+    write_symbol(fpath, device, None, footprint, status='Generator',
+                 last_updated=last_updated, **(symbol_fields or {}))
+    lines = [
+        'schema:',
+        '  name: EDASymbolGenerator',
+        '  version: 1.0',
+        'type: {0}'.format(gtype),
+        'symbolfile: {0}'.format(os.path.basename(fpath)),
+        'generators:',
+        '  - std: iec60063',
+        '    series: {0}'.format(series),
+        '    start: {0}'.format(start),
+        '    end: {0}'.format(end),
+    ]
+    for key, value in sorted(params.items()):
+        lines.append('    {0}: {1}'.format(key, value))
+    genpath = os.path.splitext(fpath)[0] + '.gen.yaml'
+    with open(genpath, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return genpath
+
+
+def write_library(path, symbols):
+    """
+    Write a symbol file for each ``(device, value, footprint)`` in
+    ``symbols`` to ``path``, in that order, and return the library.
+    """
+    for idx, (device, value, footprint) in enumerate(symbols):
+        write_symbol(os.path.join(path, 's{0:03d}.sym'.format(idx)),
+                     device, value, footprint)
+    return KVSymbolLibrary(path)
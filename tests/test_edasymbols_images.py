@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+
+import pytest
+
+from tendril.entities.edasymbols import base
+from tendril.entities.edasymbols import cache
+
+from .edasymbols import KVSymbol
+from .edasymbols import KVSymbolLibrary
+from .edasymbols import write_symbol
+
+
+class RenderingSymbol(KVSymbol):
+    # Renders by copying the symbol file into a folder of its own.
+    outfolder = None
+    rendered = []
+
+    def _generate_img_repr(self):
+        RenderingSymbol.rendered.append(self.gpath)
+        outpath = os.path.join(self.outfolder, self.img_repr_fname)
+        shutil.copyfile(self.gpath, outpath)
+        self._img_repr_path = outpath
+
+
+class RenderingLibrary(KVSymbolLibrary):
+    _symbol_class = RenderingSymbol
+
+
+@pytest.fixture
+def folders(tmpdir, monkeypatch):
+    root = str(tmpdir)
+    rval = {
+        'symbols': os.path.join(root, 'symbols'),
+        'cache': os.path.join(root, 'cache'),
+        'images': os.path.join(root, 'images'),
+        'out': os.path.join(root, 'out'),
+    }
+    monkeypatch.setattr(base, 'EDA_SYMBOL_IMAGE_FOLDER', rval['images'])
+    os.makedirs(rval['out'])
+    monkeypatch.setattr(RenderingSymbol, 'outfolder', rval['out'])
+    monkeypatch.setattr(RenderingSymbol, 'rendered', [])
+    return rval
+
+
+def _symbol(folders, name, value):
+    fpath = os.path.join(folders['symbols'], name)
+    write_symbol(fpath, 'RES SMD', value, '0603')
+    return RenderingSymbol(fpath)
+
+
+def _install_cache(folders, monkeypatch, max_size=2 ** 20):
+    image_cache = cache.EDASymbolImageCache(folders['cache'], max_size)
+    monkeypatch.setattr(cache, '_image_cache', image_cache)
+    return image_cache
+
+
+def test_rendered_lazily_at_target(folders, monkeypatch):
+    _install_cache(folders, monkeypatch)
+    symbol = _symbol(folders, 'a.sym', '1K')
+    assert RenderingSymbol.rendered == []
+    path = symbol.img_repr_path
+    assert path == os.path.join(folders['images'],
+                                RenderingSymbol._cache_namespace(), 'a.png')
+    assert os.path.basename(path) == symbol.img_repr_fname
+    assert os.path.exists(path)
+    assert symbol.img_repr_path == path
+    assert RenderingSymbol.rendered == [symbol.gpath]
+
+
+def test_cache_hit_linked_at_target(folders, monkeypatch):
+    _install_cache(folders, monkeypatch)
+    first = _symbol(folders, 'a.sym', '1K')
+    first.img_repr_path
+    # Identical content under another name is served from the cache.
+    second = _symbol(folders, 'b.sym', '1K')
+    path = second.img_repr_path
+    assert len(RenderingSymbol.rendered) == 1
+    assert path == second.img_repr_target
+    assert not path.startswith(folders['cache'])
+    assert os.path.exists(path)
+
+
+def test_evicted_images_remain_available(folders, monkeypatch):
+    first = _symbol(folders, 'a.sym', '1K')
+    second = _symbol(folders, 'b.sym', '2K')
+    image_cache = _install_cache(folders, monkeypatch,
+                                 max_size=os.path.getsize(first.gpath))
+    path = first.img_repr_path
+    second.img_repr_path
+    assert not list(image_cache._blobs())
+    assert first.img_repr_path == path
+    assert os.path.exists(path)
+    assert len(RenderingSymbol.rendered) == 2
+
+
+def test_missing_image_rerendered(folders, monkeypatch):
+    _install_cache(folders, monkeypatch)
+    symbol = _symbol(folders, 'a.sym', '1K')
+    path = symbol.img_repr_path
+    os.remove(path)
+    shutil.rmtree(folders['cache'])
+    assert symbol.img_repr_path == path
+    assert os.path.exists(path)
+    assert len(RenderingSymbol.rendered) == 2
+
+
+def test_without_image_cache(folders):
+    symbol = _symbol(folders, 'a.sym', '1K')
+    assert symbol.img_repr_path == symbol.img_repr_target
+    assert os.path.exists(symbol.img_repr_path)
+
+
+def test_prerender_images(folders, monkeypatch):
+    _install_cache(folders, monkeypatch)
+    for idx in range(5):
+        write_symbol(os.path.join(folders['symbols'], '{0}.sym'.format(idx)),
+                     'RES SMD', '{0}K'.format(idx + 1), '0603')
+    library = RenderingLibrary(folders['symbols'])
+    assert RenderingSymbol.rendered == []
+    library.prerender_images(workers=2, background=False)
+    assert len(RenderingSymbol.rendered) == 5
+    for symbol in library.symbols:
+        path = os.path.join(symbol.img_repr_folder, symbol.img_repr_fname)
+        assert os.path.exists(path)
+        assert symbol.img_repr_path == path
+    assert len(RenderingSymbol.rendered) == 5
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import copy
+import random
+import importlib
+import itertools
+
+import pytest
+
+from tendril.conventions.electronics import resistor_tools
+from tendril.conventions.electronics import capacitor_tools
+from tendril.utils.types import ParseException
+
+from .edasymbols import Item
+from .edasymbols import write_library
+
+# Attribute lookups on tendril.libraries.edasymbols load the libraries.
+jellybean = importlib.import_module('tendril.libraries.edasymbols.jellybean')
+base = importlib.import_module('tendril.libraries.edasymbols.base')
+
+
+class Symbol(object):
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return self.value
+
+
+RESISTANCES = ['1K', '1000E', '4.7K', '10K']
+RESISTOR_PARAMS = [
+    ['', '/0.063W', '/0.125W', '/0.25W'],
+    ['', '/1%', '/5%'],
+    ['', '/100ppm', '/50ppm'],
+]
+CAPACITANCES = ['100nF', '0.1uF', '1uF', '10pF']
+CAPACITOR_PARAMS = [
+    ['', '/16V', '/25V', '/50V'],
+    ['', '/10%', '/20%'],
+    ['', '/X7R', '/C0G'],
+]
+
+RESISTOR_QUERIES = {
+    'wattage': [None, '0.063W', '0.1W', '0.25W', '1W'],
+    'tolerance': [None, '1%', '2%', '10%'],
+    'tc': [None, '100ppm', '25ppm'],
+}
+CAPACITOR_QUERIES = {
+    'voltage': [None, '10V', '25V', '100V'],
+    'tolerance': [None, '10%', '5%'],
+    'tcc': [None, 'X7R', 'X5R'],
+}
+
+CASES = [
+    (resistor_tools, RESISTANCES + ['2.2K'], RESISTOR_PARAMS,
+     RESISTOR_QUERIES, {'device': 'RES SMD', 'footprint': '0603'}),
+    (capacitor_tools, CAPACITANCES + ['22nF'], CAPACITOR_PARAMS,
+     CAPACITOR_QUERIES, {'device': 'CAP CER SMD', 'footprint': '0603'}),
+]
+
+
+def _symbols(values, params, seed=0):
+    # Every combination of parameters, several times over, in a
+    # shuffled order. The missing parameter ('1K//1%') parses to an
+    # empty string rather than None.
+    symbols = []
+    for value in values[:-1]:
+        for combination in itertools.product(*params):
+            symbols.append(Symbol(value + ''.join(combination)))
+        symbols.append(Symbol(value + '//' + params[1][1].strip('/')))
+    symbols = symbols * 2
+    random.Random(seed).shuffle(symbols)
+    return symbols
+
+
+def _queries(jb_tools, values, queries, context):
+    names = sorted(queries.keys())
+    for value in values:
+        for combination in itertools.product(*[queries[x] for x in names]):
+            kwargs = dict((k, v) for k, v in zip(names, combination)
+                          if v is not None)
+            yield jb_tools.pack(value, context=context, **kwargs)
+
+
+def _parsed(jb_tools, symbols):
+    rval = []
+    for symbol in symbols:
+        try:
+            rval.append((symbol, jb_tools.parse(symbol.value)))
+        except ParseException:
+            continue
+    return rval
+
+
+def _reference(jb_tools, parsed, tjb):
+    # Scores every symbol with jb_tools.match, as the libraries did
+    # before symbols were partitioned.
+    candidates = []
+    for symbol, sjb in parsed:
+        score = jb_tools.match(tjb, sjb)
+        if score:
+            candidates.append((symbol, score))
+    if not candidates:
+        return None
+    maxscore = max(x[1] for x in candidates)
+    return jb_tools.bestmatch(tjb, [x for x in candidates
+                                    if x[1] == maxscore])
+
+
+@pytest.fixture(params=['default', 'vector', 'python'])
+def mode(request, monkeypatch):
+    if request.param == 'vector':
+        if jellybean.numpy is None:
+            pytest.skip("NumPy is not installed")
+        monkeypatch.setattr(jellybean.JellybeanPartition,
+                            'vector_threshold', 0)
+    elif request.param == 'python':
+        monkeypatch.setattr(jellybean, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('jb_tools, values, params, queries, context', CASES)
+def test_best_match(mode, jb_tools, values, params, queries, context):
+    symbols = _symbols(values, params)
+    partition = jellybean.JellybeanPartition(jb_tools, symbols)
+    parsed = _parsed(jb_tools, symbols)
+    nmatched = 0
+    for tjb in _queries(jb_tools, values, queries, context):
+        expected = _reference(jb_tools, parsed, tjb)
+        assert partition.best_match(tjb) is expected
+        if expected is not None:
+            nmatched += 1
+    assert nmatched
+
+
+@pytest.mark.parametrize('jb_tools, values, params, queries, context', CASES)
+def test_vector_scores(jb_tools, values, params, queries, context):
+    if jellybean.numpy is None:
+        pytest.skip("NumPy is not installed")
+    partition = jellybean.JellybeanPartition(jb_tools,
+                                             _symbols(values, params))
+    for tjb in _queries(jb_tools, values, queries, context):
+        lo, hi = partition._exact_range(getattr(tjb, partition.code))
+        scores = partition._vector_scores(tjb, lo, hi)
+        assert scores is not None
+        expected = [jb_tools.match(tjb, sjb) or 0
+                    for _, sjb in partition._rows[lo:hi]]
+        assert [int(x) for x in scores] == expected
+
+
+NEAREST = [
+    ('RES SMD', '1.5K', '0603'),
+    ('RES SMD', '1K', '0603'),
+    ('RES SMD', '1.1K', '0603'),
+    ('RES SMD', '1K/0.25W', '0603'),
+    ('RES SMD', '950E', '0603'),
+    ('RES SMD', '1.2K', '0603'),
+    ('RES SMD', '1K/0.063W', '0603'),
+    ('RES SMD', '1.05K', '0805'),
+    ('CAP CER SMD', '100nF', '0603'),
+    ('CAP CER SMD', '120nF/50V', '0603'),
+    ('CAP CER SMD', '82nF/16V', '0603'),
+]
+
+
+def _values(symbols):
+    return [x.value for x in symbols]
+
+
+def test_nearest_window_and_order(tmpdir):
+    library = write_library(str(tmpdir), NEAREST)
+    find = library.find_nearest_resistor
+    # Closest first, with symbols of the same value in library order.
+    assert _values(find('RES SMD', '0603', '1.02K', tolerance=0.12)) == \
+        ['1K', '1K/0.25W', '1K/0.063W', '950E', '1.1K']
+    assert _values(find('RES SMD', '0603', '1.02K', tolerance=0.03)) == \
+        ['1K', '1K/0.25W', '1K/0.063W']
+    assert _values(find('RES SMD', '0603', '1K', tolerance=0)) == \
+        ['1K', '1K/0.25W', '1K/0.063W']
+    assert _values(find('RES SMD', '0603', '1.38K', tolerance=0.2)) == \
+        ['1.5K', '1.2K']
+    assert find('RES SMD', '0603', '3.3K', tolerance=0.5) == []
+    assert _values(find('RES SMD', '0805', '1K')) == ['1.05K']
+    assert find('RES SMD', '1206', '1K') == []
+    assert _values(library.find_nearest_capacitor(
+        'CAP CER SMD', '0603', '0.1uF', tolerance=0.19
+    )) == ['100nF', '82nF/16V']
+
+
+def test_nearest_parameters(tmpdir):
+    library = write_library(str(tmpdir), NEAREST)
+    assert _values(library.find_nearest_resistor(
+        'RES SMD', '0603', '1K', tolerance=0.12, wattage='0.25W'
+    )) == ['1K/0.25W']
+    assert _values(library.find_nearest_capacitor(
+        'CAP CER SMD', '0603', '100nF', tolerance=0.25, voltage='25V'
+    )) == ['120nF/50V']
+
+
+@pytest.mark.parametrize('value', ['abc', '1.5Q'])
+def test_nearest_unparseable(tmpdir, value):
+    library = write_library(str(tmpdir), NEAREST)
+    for finder in (library.find_resistor, library.find_nearest_resistor):
+        with pytest.raises(base.EDASymbolNotFound):
+            finder('RES SMD', '0603', value)
+
+
+# The values parts are harmonized to. Parts which aren't in the library,
+# and those which aren't jellybean parts, are left as they are.
+HARMONIZED = {
+    ('RES SMD', '1K', '0603'): '1K/0.125W/1%',
+    ('RES SMD', '1K/0.063W', '0603'): '1K/0.125W/1%',
+    ('RES SMD', '4.7K', '0603'): '4.7K/0.1W',
+    ('RES SMD', '47K', '0603'): '47K',
+    ('CAP CER SMD', '0.1uF', '0603'): '100nF/16V',
+    ('IC SMD', 'LM358', 'SOIC-8'): 'LM358',
+}
+
+
+def test_harmonize_many(tmpdir, monkeypatch):
+    library = write_library(str(tmpdir), [
+        ('RES SMD', '1K/0.125W/1%', '0603'),
+        ('RES SMD', '4.7K/0.1W', '0603'),
+        ('CAP CER SMD', '100nF/16V', '0603'),
+    ])
+    originals = sorted(HARMONIZED.keys()) * 3
+    random.Random(0).shuffle(originals)
+    items = [Item(*x) for x in originals]
+    expected = [library.jb_harmonize(copy.deepcopy(x)).data for x in items]
+
+    calls = []
+    find_jellybean = library.find_jellybean
+
+    def _counted(jb_tools, device, footprint, typevalue, **kwargs):
+        calls.append((device, footprint, str(typevalue)))
+        return find_jellybean(jb_tools, device, footprint, typevalue,
+                              **kwargs)
+    monkeypatch.setattr(library, 'find_jellybean', _counted)
+    assert library.jb_harmonize_many(items) is items
+    assert [x.data for x in items] == expected
+    # Every distinct jellybean part is resolved once.
+    assert len(calls) == 5
+
+    for original, item in zip(originals, items):
+        assert item.data['value'] == HARMONIZED[original]
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import csv
+import sys
+import importlib
+import subprocess
+
+import pytest
+
+from tendril.utils.fsutils import VersionedOutputFile
+
+from .edasymbols import write_library
+from .edasymbols import write_symbol
+from .edasymbols import Item
+
+# Attribute lookups on tendril.libraries.edasymbols load the libraries.
+base = importlib.import_module('tendril.libraries.edasymbols.base')
+manager = importlib.import_module('tendril.libraries.edasymbols.manager')
+
+
+def test_lazy_submodule_import():
+    # The manager replaces the package in sys.modules before any of its
+    # submodules are imported, so this needs a fresh interpreter.
+    script = '\n'.join([
+        'import sys',
+        'import tendril.libraries.edasymbols.jellybean',
+        'import tendril.libraries.edasymbols.base as base',
+        "manager = sys.modules['tendril.libraries.edasymbols']",
+        'assert not manager._loaded',
+        "assert base.__name__ == 'tendril.libraries.edasymbols.base'",
+    ])
+    env = dict(os.environ, TENDRIL_EDA_LIBRARY_LAZY='1')
+    subprocess.check_call([sys.executable, '-c', script], env=env)
+
+
+@pytest.fixture
+def libraries(tmpdir):
+    first = write_library(os.path.join(str(tmpdir), 'first'), [
+        ('RES SMD', '1K/0.1W', '0603'),
+        ('RES SMD', '1.2K', '0603'),
+    ])
+    second = write_library(os.path.join(str(tmpdir), 'second'), [
+        ('RES SMD', '1.1K/0.25W', '0603'),
+        ('RES SMD', '10K', '0603'),
+        ('CAP CER SMD', '100nF', '0603'),
+    ])
+    return first, second
+
+
+def _values(symbols):
+    return [x.value for x in symbols]
+
+
+def test_nearest_fused(libraries, library_manager):
+    lm = library_manager(*libraries)
+    # The first library with any symbols in the window provides them
+    # all. Libraries are not merged.
+    assert _values(lm.find_nearest_resistor(
+        'RES SMD', '0603', '1.05K', tolerance=0.2
+    )) == ['1K/0.1W', '1.2K']
+    assert _values(lm.find_nearest_resistor(
+        'RES SMD', '0603', '9.1K', tolerance=0.2
+    )) == ['10K']
+    assert _values(lm.find_nearest_capacitor(
+        'CAP CER SMD', '0603', '0.1uF'
+    )) == ['100nF']
+    assert lm.find_nearest_resistor('RES SMD', '0603', '47K') == []
+
+
+def test_nearest_unfused(libraries, library_manager):
+    lm = library_manager(*libraries, fusion=False)
+    assert _values(lm.find_nearest_resistor(
+        'RES SMD', '0603', '1.05K', tolerance=0.2
+    )) == ['1K/0.1W', '1.2K']
+    assert lm.find_nearest_resistor('RES SMD', '0603', '9.1K',
+                                    tolerance=0.2) == []
+
+
+@pytest.mark.parametrize('fusion', [True, False])
+def test_nearest_unparseable(libraries, library_manager, fusion):
+    lm = library_manager(*libraries, fusion=fusion)
+    for finder in (lm.find_resistor, lm.find_nearest_resistor):
+        with pytest.raises(lm.nosymbolexception):
+            finder('RES SMD', '0603', 'abc')
+
+
+def test_harmonize_many_first_library(libraries, library_manager):
+    lm = library_manager(*libraries)
+    items = [Item('RES SMD', '1K', '0603'), Item('RES SMD', '1.1K', '0603'),
+             Item('RES SMD', '1K', '0603')]
+    assert lm.jb_harmonize_many(items) is items
+    # Only the library of the highest priority is used to harmonize.
+    assert [x.data['value'] for x in items] == ['1K/0.1W', '1.1K', '1K/0.1W']
+    assert lm.jb_harmonize(Item('RES SMD', '1.1K', '0603')).data == \
+        {'device': 'RES SMD', 'value': '1.1K', 'footprint': '0603'}
+    lm = library_manager(libraries[1], libraries[0])
+    assert lm.jb_harmonize(Item('RES SMD', '1.1K', '0603')).data == \
+        {'device': 'RES SMD', 'value': '1.1K/0.25W', 'footprint': '0603'}
+
+
+@pytest.fixture
+def audit_path(tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), 'audits')
+    os.makedirs(path)
+    monkeypatch.setattr(base, 'AUDIT_PATH', path)
+    return path
+
+
+def _read_audit(audit_path, name, diff=False):
+    fname = 'esymlib-{0}.audit{1}.csv'.format(name, '.diff' if diff else '')
+    with open(os.path.join(audit_path, fname)) as f:
+        return list(csv.reader(f))
+
+
+def test_export_audit_unchanged(libraries, audit_path):
+    library = libraries[0]
+    assert library.export_audit('first') is True
+    rows = _read_audit(audit_path, 'first')
+    assert rows[0] == library._audit_header
+    assert [x[2] for x in rows[1:]] == [x.ident for x in library.symbols]
+    mtime = os.path.getmtime(os.path.join(audit_path,
+                                          'esymlib-first.audit.csv'))
+
+    # Nothing is written, not even a new version, if nothing changed.
+    library.regenerate()
+    assert library.export_audit('first', diff=True) is False
+    assert os.listdir(audit_path) == ['esymlib-first.audit.csv']
+    assert os.path.getmtime(os.path.join(
+        audit_path, 'esymlib-first.audit.csv')) == mtime
+
+
+@pytest.fixture
+def versioned_backups(tmpdir):
+    # Some releases of tendril-utils-core can't back up the previous
+    # version of a file on Python 3, which writing a changed audit needs.
+    fpath = os.path.join(str(tmpdir), 'probe.csv')
+    try:
+        for _ in range(2):
+            outf = VersionedOutputFile(fpath)
+            outf._outf.close()
+            outf._outf = None
+            outf._replace_current_file()
+    except AttributeError:
+        pytest.skip("VersionedOutputFile can't back up files here")
+
+
+def test_export_audit_diff(libraries, audit_path, versioned_backups):
+    library = libraries[1]
+    library.export_audit('second')
+    old = dict((x.gpath, x) for x in library.symbols)
+    fpaths = sorted(old.keys())
+    # One symbol is modified, one is replaced by another with a different
+    # ident, one is removed and one is added.
+    write_symbol(fpaths[0], 'RES SMD', '1.1K/0.25W', '0603',
+                 status='Deprecated')
+    write_symbol(fpaths[1], 'RES SMD', '12K', '0603')
+    os.remove(fpaths[2])
+    write_symbol(os.path.join(library.path, 'new.sym'),
+                 'RES SMD', '22K', '0805')
+    library.regenerate()
+    assert library.export_audit('second', diff=True) is True
+
+    assert len([x for x in os.listdir(audit_path)
+                if x.startswith('esymlib-second.audit.csv')]) == 2
+    statuses = dict((x[7], x[1]) for x in _read_audit(audit_path, 'second'))
+    assert statuses[fpaths[0]] == 'Deprecated'
+
+    rows = _read_audit(audit_path, 'second', diff=True)
+    assert rows[0] == ['change'] + library._audit_header
+    changes = sorted((x[0], x[8], x[3]) for x in rows[1:])
+    assert changes == sorted([
+        ('modified', fpaths[0], 'RES SMD 1.1K/0.25W 0603'),
+        ('added', fpaths[1], 'RES SMD 12K 0603'),
+        ('removed', fpaths[1], old[fpaths[1]].ident),
+        ('removed', fpaths[2], old[fpaths[2]].ident),
+        ('added', os.path.join(library.path, 'new.sym'),
+         'RES SMD 22K 0805'),
+    ])
+    modified = [x for x in rows if x[0] == 'modified'][0]
+    assert modified[2] == 'Deprecated'
+
+
+@pytest.mark.parametrize('threaded', [True, False])
+def test_export_audits(libraries, audit_path, library_manager, monkeypatch,
+                       threaded):
+    if not threaded:
+        monkeypatch.setattr(manager, 'ThreadPoolExecutor', None)
+    lm = library_manager(*libraries)
+    lm.export_audits()
+    for name, library in zip(('first', 'second'), libraries):
+        rows = _read_audit(audit_path, name)
+        assert [x[2] for x in rows[1:]] == [x.ident for x in library.symbols]
+    lm.export_audits(diff=True)
+    assert len(os.listdir(audit_path)) == 2
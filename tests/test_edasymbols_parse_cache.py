@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+
+from tendril.entities.edasymbols import cache
+from tendril.entities.edasymbols.base import EDASymbolBase
+
+from .edasymbols import KVSymbol
+from .edasymbols import KVSymbolLibrary
+from .edasymbols import write_symbol
+from .edasymbols import write_generator
+
+
+DATASHEET = 'http://example.com/ds.pdf'
+
+
+class CountingSymbol(KVSymbol):
+    parsed = 0
+
+    def _get_sym(self):
+        CountingSymbol.parsed += 1
+        super(CountingSymbol, self)._get_sym()
+
+
+class CachedSymbol(CountingSymbol):
+    _cache_fields = EDASymbolBase._sym_fields
+
+
+class CachedLibrary(KVSymbolLibrary):
+    _symbol_class = CachedSymbol
+
+
+def _load_twice(symbol_class, fpath, path, monkeypatch):
+    # Loads the symbol as two successive processes sharing a persistent
+    # parse cache would.
+    symbols = []
+    for _ in range(2):
+        parse_cache = cache.EDASymbolParseCache(path)
+        monkeypatch.setattr(cache, '_parse_cache', parse_cache)
+        symbols.append(symbol_class(fpath))
+        parse_cache.flush()
+    return symbols
+
+
+def test_uncached_by_default(tmpdir, monkeypatch):
+    fpath = os.path.join(str(tmpdir), 'sym', 'r.sym')
+    write_symbol(fpath, 'RES SMD', '1K', '0603', datasheet=DATASHEET)
+    CountingSymbol.parsed = 0
+    cold, warm = _load_twice(CountingSymbol, fpath,
+                             os.path.join(str(tmpdir), 'cache'), monkeypatch)
+    assert CountingSymbol.parsed == 2
+    assert cold.datasheet_url == DATASHEET
+    assert warm.datasheet_url == DATASHEET
+    assert not cache.get_parse_cache().entries
+
+
+def test_declared_fields_restored(tmpdir, monkeypatch):
+    fpath = os.path.join(str(tmpdir), 'sym', 'r.sym')
+    write_symbol(fpath, 'RES SMD', '1K', '0603', datasheet=DATASHEET,
+                 manufacturer='ACME', description='Resistor')
+    CountingSymbol.parsed = 0
+    cold, warm = _load_twice(CachedSymbol, fpath,
+                             os.path.join(str(tmpdir), 'cache'), monkeypatch)
+    assert CountingSymbol.parsed == 1
+    for symbol in (cold, warm):
+        assert symbol.ident == 'RES SMD 1K 0603'
+        assert symbol.status == 'Active'
+        assert symbol.description == 'Resistor'
+        assert symbol.datasheet_url == DATASHEET
+        assert symbol.manufacturer == 'ACME'
+    assert warm.last_updated == cold.last_updated
+
+
+def _shape(library):
+    return (
+        [(x.ident, x.value, x.status, x.last_updated, x.datasheet_url)
+         for x in library.symbols],
+        dict((k, [x.gpath for x in v]) for k, v in library.index.items()),
+    )
+
+
+def test_warm_library_matches_cold(tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), 'sym')
+    write_symbol(os.path.join(path, 'r.sym'), 'RES SMD', '1K', '0603',
+                 datasheet=DATASHEET)
+    write_symbol(os.path.join(path, 'blank.sym'), 'RES SMD', None, '0805')
+    write_generator(os.path.join(path, 'rgen.sym'), 'RES SMD', '1206',
+                    'resistor', 'E6', '1K', '10K')
+    CountingSymbol.parsed = 0
+    libraries = _load_twice(
+        lambda x: CachedLibrary(x, include_generators=True), path,
+        os.path.join(str(tmpdir), 'cache'), monkeypatch
+    )
+    assert CountingSymbol.parsed == 3
+    cold, warm = [_shape(x) for x in libraries]
+    assert warm == cold
+    assert 'FATAL' in cold[1]
+
+
+def test_parallel_load_matches_serial(tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), 'sym')
+    for idx in range(12):
+        write_symbol(os.path.join(path, 'r{0}.sym'.format(idx)), 'RES SMD',
+                     '{0}K'.format(idx + 1), '0603', datasheet=DATASHEET)
+    write_symbol(os.path.join(path, 'blank.sym'), 'RES SMD', None, '0805')
+    write_generator(os.path.join(path, 'sub', 'rgen.sym'), 'RES SMD',
+                    '1206', 'resistor', 'E6', '1K', '10K')
+    CountingSymbol.parsed = 0
+    serial = CachedLibrary(path, include_generators=True, workers=0)
+    assert CountingSymbol.parsed == 14
+
+    monkeypatch.setattr(cache, '_parse_cache', cache.EDASymbolParseCache())
+    CountingSymbol.parsed = 0
+    parallel = CachedLibrary(path, include_generators=True, workers=2)
+    # Everything was parsed in the workers.
+    assert CountingSymbol.parsed == 0
+    assert _shape(parallel) == _shape(serial)
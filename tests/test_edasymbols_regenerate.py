@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+
+import pytest
+
+from tendril.entities.edasymbols import cache
+
+from .edasymbols import KVSymbolGenerator
+from .edasymbols import KVSymbolLibrary
+from .edasymbols import write_symbol
+from .edasymbols import write_generator
+
+
+RESISTOR_QUERIES = ['1K', '2.2K', '4.7K', '10K', '22K', '47K', '150K']
+
+
+def _touch(fpath):
+    # Files rewritten in quick succession may keep their mtime.
+    stat = os.stat(fpath)
+    os.utime(fpath, (stat.st_atime, stat.st_mtime + 60))
+
+
+def _library_files(path):
+    def _fpath(name):
+        return os.path.join(path, name)
+    write_symbol(_fpath('r1k.sym'), 'RES SMD', '1K/0.125W/1%', '0603',
+                 last_updated='2019-01-01T00:00:00')
+    write_symbol(_fpath('r1k-b.sym'), 'RES SMD', '1K', '0603',
+                 last_updated='2019-01-03T00:00:00')
+    write_symbol(_fpath('r10k.sym'), 'RES SMD', '10K', '0603',
+                 last_updated='2019-01-02T00:00:00')
+    write_symbol(_fpath('c100n.sym'), 'CAP CER SMD', '100nF/16V', '0603',
+                 last_updated='2019-01-04T00:00:00')
+    write_symbol(_fpath('sub/r4k7.sym'), 'RES SMD', '4.7K', '0603')
+    write_generator(_fpath('rgen.sym'), 'RES SMD', '0603', 'resistor',
+                    'E6', '1K', '10K', last_updated='2019-01-05T00:00:00')
+    write_generator(_fpath('sub/rgen.sym'), 'RES SMD', '0805', 'resistor',
+                    'E12', '10K', '100K',
+                    last_updated='2019-01-06T00:00:00')
+
+
+def _edit_library(path):
+    def _fpath(name):
+        return os.path.join(path, name)
+    # A concrete symbol changes its value, and another changes only its
+    # timestamp.
+    write_symbol(_fpath('r10k.sym'), 'RES SMD', '22K', '0603',
+                 last_updated='2019-01-10T00:00:00')
+    _touch(_fpath('r10k.sym'))
+    write_symbol(_fpath('r1k.sym'), 'RES SMD', '1K/0.125W/1%', '0603',
+                 last_updated='2019-01-11T00:00:00')
+    _touch(_fpath('r1k.sym'))
+    # Symbols and generators are added.
+    write_symbol(_fpath('sub/r2k2.sym'), 'RES SMD', '2.2K', '0603',
+                 last_updated='2019-01-07T00:00:00')
+    write_generator(_fpath('sub/deeper/rgen.sym'), 'RES SMD', '0603',
+                    'resistor', 'E3', '22K', '470K')
+    # Symbols are removed.
+    os.remove(_fpath('c100n.sym'))
+    os.remove(_fpath('sub/r4k7.sym'))
+    # Only the generator file changes.
+    genpath = write_generator(_fpath('rgen.sym'), 'RES SMD', '0603',
+                              'resistor', 'E12', '1.2K', '4.7K',
+                              last_updated='2019-01-05T00:00:00')
+    _touch(genpath)
+
+
+def _shape(symbols):
+    return [(x.gpath, x.ident, x.is_virtual) for x in symbols]
+
+
+def _shape_index(index):
+    return dict((k, _shape(v)) for k, v in index.items())
+
+
+def _lookups(finder, device, footprint):
+    rval = []
+    for value in RESISTOR_QUERIES:
+        try:
+            symbol = finder(device, footprint, value)
+            rval.append((symbol.gpath, symbol.ident))
+        except Exception as e:
+            rval.append(type(e).__name__)
+    return rval
+
+
+def _library_state(library):
+    latest = library.get_latest_symbols
+    return {
+        'symbols': _shape(library.symbols),
+        'index': _shape_index(library.index),
+        'jb_index': _shape_index(library._jb_index),
+        'latest': _shape(latest(n=1000)),
+        'latest_virtual': _shape(latest(n=1000, include_virtual=True)),
+        'latest_since': _shape(latest(n=3, since='2019-01-05')),
+        'generator_names': library.generator_names,
+        'generators': dict((x, library.get_generator(x).gpath)
+                           for x in library.generator_names),
+        'resistors': _lookups(library.find_resistor, 'RES SMD', '0603'),
+    }
+
+
+@pytest.mark.parametrize('include_generators', [False, True])
+def test_incremental_matches_fresh(tmpdir, include_generators):
+    path = str(tmpdir)
+    _library_files(path)
+    library = KVSymbolLibrary(path, include_generators=include_generators)
+    # Jellybean partitions which are already built are updated as well.
+    _library_state(library)
+
+    _edit_library(path)
+    affected = library.regenerate(incremental=True)
+    fresh = KVSymbolLibrary(path, include_generators=include_generators)
+    assert _library_state(library) == _library_state(fresh)
+    assert affected
+    assert library.regenerate(incremental=True) == set()
+    assert _library_state(library) == _library_state(fresh)
+
+
+def _manager_state(lm):
+    return {
+        'index': _shape_index(lm.index),
+        'resistors': _lookups(lm.find_resistor, 'RES SMD', '0603'),
+    }
+
+
+def test_manager_incremental_matches_fresh(tmpdir, library_manager):
+    first = os.path.join(str(tmpdir), 'first')
+    second = os.path.join(str(tmpdir), 'second')
+    _library_files(first)
+    _library_files(second)
+    lm = library_manager(KVSymbolLibrary(first), KVSymbolLibrary(second))
+    _manager_state(lm)
+
+    # Idents change in one library and then in both, when some are no
+    # longer provided by either.
+    for path in (second, first):
+        _edit_library(path)
+        lm.regenerate(incremental=True)
+        fresh = library_manager(KVSymbolLibrary(first),
+                                KVSymbolLibrary(second))
+        assert _manager_state(lm) == _manager_state(fresh)
+
+
+def _cached_genpaths():
+    return set(x[1] for x in cache.get_generator_cache()._entries)
+
+
+def _generators(path):
+    genpaths = []
+    for name, start in (('ra', '1K'), ('rb', '10K'), ('rc', '100K')):
+        genpaths.append(write_generator(
+            os.path.join(path, name + '.sym'), 'RES SMD', '0603',
+            'resistor', 'E6', start, '1M'
+        ))
+    return genpaths
+
+
+def test_removed_generators_discarded(tmpdir):
+    path = str(tmpdir)
+    ra, rb, rc = _generators(path)
+    library = KVSymbolLibrary(path)
+    assert _cached_genpaths() == set([ra, rb, rc])
+
+    os.remove(ra)
+    os.remove(os.path.join(path, 'ra.sym'))
+    # A generator symbol which is no longer a generator.
+    write_symbol(os.path.join(path, 'rb.sym'), 'RES SMD', '1K', '0603',
+                 last_updated='2019-02-01T00:00:00')
+    library.regenerate(incremental=True)
+    assert _cached_genpaths() == set([rc])
+
+    os.remove(rc)
+    os.remove(os.path.join(path, 'rc.sym'))
+    library.regenerate()
+    assert _cached_genpaths() == set()
+
+
+def test_generators_shared_between_libraries(tmpdir):
+    path = str(tmpdir)
+    genpaths = _generators(path)
+    first = KVSymbolLibrary(path)
+    second = KVSymbolLibrary(path)
+    for a, b in zip(first.generators, second.generators):
+        assert a.generator is b.generator
+    entries = cache.get_generator_cache()._entries
+    assert set(entries.keys()) == set((KVSymbolGenerator, x)
+                                      for x in genpaths)
+
+
+def test_generator_lookups(tmpdir):
+    path = str(tmpdir)
+    _library_files(path)
+    library = KVSymbolLibrary(path)
+    top = os.path.join(path, 'rgen.sym')
+    sub = os.path.join(path, 'sub', 'rgen.sym')
+    # Generators of the same name are looked up in library order.
+    assert library.generator_names == ['rgen.gen', 'rgen.gen']
+    assert library.get_generator('rgen.gen').gpath == top
+    assert library.get_generator('missing.gen') is None
+
+    assert library.get_ident_generator('RES SMD 2.2K 0603').gpath == top
+    assert library.get_ident_generator('RES SMD 47K 0805').gpath == sub
+    # Also provided by a concrete symbol.
+    assert library.get_ident_generator('RES SMD 10K 0603').gpath == top
+    # Only provided by concrete symbols, or not at all.
+    assert library.get_ident_generator('RES SMD 1K/0.125W/1% 0603') is None
+    assert library.get_ident_generator('RES SMD 47K 0603') is None
+
+    # The reverse index follows regenerations.
+    _edit_library(path)
+    library.regenerate(incremental=True)
+    deeper = os.path.join(path, 'sub', 'deeper', 'rgen.sym')
+    assert library.get_ident_generator('RES SMD 6.8K 0603') is None
+    assert library.get_ident_generator('RES SMD 1.2K 0603').gpath == top
+    assert library.get_ident_generator('RES SMD 47K 0603').gpath == deeper
+    os.remove(os.path.join(path, 'sub', 'rgen.gen.yaml'))
+    os.remove(sub)
+    library.regenerate(incremental=True)
+    assert library.get_ident_generator('RES SMD 47K 0805') is None
+    assert library.generator_names == ['rgen.gen', 'rgen.gen']
+    assert library.get_generator('rgen.gen').gpath == top
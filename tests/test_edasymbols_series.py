@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import random
+import importlib
+from decimal import Decimal
+
+import iec60063
+import pytest
+
+from tendril.conventions import series as conventions
+from tendril.conventions.series import CustomValueSeries
+from tendril.utils.types.electromagnetic import Resistance
+from tendril.schema.edasymbols import IndexedValueSeries
+from tendril.schema.edasymbols import SeriesValues
+from tendril.schema.edasymbols import get_series_values
+from tendril.schema.edasymbols import register_series
+
+from .edasymbols import KVSymbolLibrary
+from .edasymbols import write_generator
+
+# tendril.schema is a schema manager, the module itself is needed here.
+schema = importlib.import_module('tendril.schema.edasymbols')
+
+
+SERIES = ['E3', 'E6', 'E12', 'E24', 'E48', 'E96', 'E192']
+OSTRS = ['resistor', 'capacitor']
+
+# Strings which are not values of any series, or are only written
+# differently from them.
+INVALID = ['', 'K', 'abc', '1.23K', '4.7', '1K0', '01K', '1.0K', '1000E',
+           '4700pF', '0.1uF', '1000000M', '1E3']
+
+
+def _ostrs(name):
+    return iec60063.get_ostr(name)
+
+
+def _check(values, expected):
+    # Compares every part of the sequence interface against the list of
+    # values, before and after it is materialized by iterating over it.
+    assert len(values) == len(expected)
+    for idx in (0, len(expected) // 2, -1):
+        if expected:
+            assert values[idx] == expected[idx]
+    assert values[1:7:2] == expected[1:7:2]
+    for valstr in expected[::17] + INVALID:
+        assert (valstr in values) == (valstr in expected)
+        if valstr in expected:
+            assert values.index(valstr) == expected.index(valstr)
+    assert list(values) == expected
+    assert values[-3:] == expected[-3:]
+    assert len(values) == len(expected)
+
+
+@pytest.mark.parametrize('series', SERIES)
+@pytest.mark.parametrize('ostrs', OSTRS)
+def test_full_series(series, ostrs):
+    expected = list(iec60063.gen_vals(series, _ostrs(ostrs)))
+    _check(SeriesValues(series, ostrs), expected)
+
+
+@pytest.mark.parametrize('series', SERIES)
+@pytest.mark.parametrize('ostrs', OSTRS)
+def test_random_ranges(series, ostrs):
+    rng = random.Random('{0}{1}'.format(series, ostrs))
+    full = list(iec60063.gen_vals(series, _ostrs(ostrs)))
+    choices = full + INVALID + [None] * 4
+    for _ in range(40):
+        start, end = rng.choice(choices), rng.choice(choices)
+        expected = list(iec60063.gen_vals(series, _ostrs(ostrs),
+                                          start=start, end=end))
+        _check(SeriesValues(series, ostrs, start=start, end=end), expected)
+
+
+@pytest.mark.parametrize('start, end', [
+    ('1K', '4.7K'),
+    ('4.7K', '1K'),
+    ('4.7K', '4.7K'),
+    ('1K', None),
+    (None, '1K'),
+    ('1.23K', '4.7K'),
+    ('1K', '1.23K'),
+    ('1.23K', '4.56K'),
+    ('', ''),
+    ('999G', None),
+    ('100G', '1m'),
+])
+def test_edge_ranges(start, end):
+    expected = list(iec60063.gen_vals('E24', iec60063.res_ostrs,
+                                      start=start, end=end))
+    _check(SeriesValues('E24', iec60063.res_ostrs, start=start, end=end),
+           expected)
+
+
+def test_custom_series():
+    series = [Decimal('1'), Decimal('2.5'), Decimal('5')]
+    ostrs = ['A', 'B']
+    expected = list(iec60063.gen_vals(series, ostrs, start='2.5A',
+                                      end='50B'))
+    _check(SeriesValues(series, ostrs, start='2.5A', end='50B'), expected)
+
+
+def test_shared_values():
+    values = get_series_values('E12', 'resistor', '1K', '1M')
+    assert get_series_values('E12', 'resistor', '1K', '1M') is values
+    assert get_series_values('E12', 'resistor', '1K', '10M') is not values
+    assert list(values) == list(iec60063.gen_vals('E12', 'resistor',
+                                                  '1K', '1M'))
+
+
+PRECISION = [('1K', '1K/0.1W/1%'), ('4.7K', '4.7K/0.1W/1%'),
+             ('10K', '10K/0.1W/1%'), ('2.2K', '2.2K/0.1W/1%'),
+             ('2.21K', '2.2K/0.1W/1%')]
+
+
+def _series(cls, name, items, bulk=False):
+    series = cls(name, 'resistor', device='RES SMD', footprint='0603')
+    if bulk:
+        series.add_values(items)
+    else:
+        for type_value, value in items:
+            series.add_value(type_value, value)
+    return series
+
+
+def test_indexed_series_matches_custom():
+    custom = _series(CustomValueSeries, 'PRECISION', PRECISION)
+    indexed = _series(IndexedValueSeries, 'PRECISION', PRECISION, bulk=True)
+    assert indexed._values == custom._values
+    assert list(indexed.gen_vals()) == list(custom.gen_vals())
+    start, end = Resistance('2K'), Resistance('5K')
+    assert list(indexed.gen_vals(start=start, end=end)) == \
+        list(custom.gen_vals(start=start, end=end))
+    for _, value in PRECISION + [(None, '47K/0.1W/1%')]:
+        assert indexed.get_type_value(value) == custom.get_type_value(value)
+    for type_value in ('1K', '4.7K', '10K'):
+        assert indexed.get_partno(type_value) == custom.get_partno(type_value)
+
+
+def test_series_digest():
+    first = _series(IndexedValueSeries, 'PRECISION', PRECISION, bulk=True)
+    second = _series(IndexedValueSeries, 'PRECISION', PRECISION)
+    assert first.digest == second.digest
+    second.add_value('47K', '47K/0.1W/1%')
+    assert first.digest != second.digest
+    renamed = _series(IndexedValueSeries, 'OTHER', PRECISION, bulk=True)
+    assert renamed.digest != first.digest
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Series are registered for the whole process, so the registry is
+    # restored after each test.
+    saved = dict(conventions.custom_series)
+    monkeypatch.setattr(schema, '_registered_series', {})
+    registered = []
+    register_custom_series = schema.register_custom_series
+
+    def _register(series):
+        registered.append(series.name)
+        register_custom_series(series)
+    monkeypatch.setattr(schema, 'register_custom_series', _register)
+    yield registered
+    conventions.custom_series.clear()
+    conventions.custom_series.update(saved)
+
+
+def test_register_series(registry):
+    first = _series(IndexedValueSeries, 'TESTA', PRECISION, bulk=True)
+    second = _series(IndexedValueSeries, 'TESTB', PRECISION[:2], bulk=True)
+    assert register_series([first, second]) == 2
+    assert conventions.custom_series['TESTA'] is first
+    assert register_series([first, second]) == 0
+    # Series with the same content are not registered again.
+    same = _series(IndexedValueSeries, 'TESTA', PRECISION)
+    assert register_series([same]) == 0
+    assert conventions.custom_series['TESTA'] is first
+    changed = _series(IndexedValueSeries, 'TESTA', PRECISION[:-1], bulk=True)
+    assert register_series([second, changed]) == 1
+    assert conventions.custom_series['TESTA'] is changed
+    assert registry == ['TESTA', 'TESTB', 'TESTA']
+
+
+def _write_series_generator(fpath, precision):
+    genpath = write_generator(fpath, 'RES SMD', '0603', 'resistor',
+                              'E6', '1K', '10K', wattage='0.1W')
+    lines = [
+        'composite_series:',
+        '  name: TESTCOMPOSITE',
+        '  desc: Composite',
+        'custom_series:',
+        '  TESTPRECISION:',
+        '    detail:',
+        '      type: resistor',
+        '      desc: Precision',
+        '    values:',
+    ]
+    lines.extend('      {0}: {1}'.format(*x) for x in precision)
+    with open(genpath, 'a') as f:
+        f.write('\n'.join(lines) + '\n')
+    return genpath
+
+
+def test_library_series(tmpdir, registry):
+    fpath = os.path.join(str(tmpdir), 'rgen.sym')
+    _write_series_generator(fpath, PRECISION[:3])
+    library = KVSymbolLibrary(str(tmpdir))
+    assert sorted(registry) == ['TESTCOMPOSITE', 'TESTPRECISION']
+    composite = conventions.custom_series['TESTCOMPOSITE']
+    partno = composite.get_partno('4.7K')
+    assert partno.startswith('4.7K/')
+    assert str(composite.get_type_value(partno)) == '4.7K'
+    assert conventions.custom_series['TESTPRECISION'].get_partno('4.7K') \
+        == '4.7K/0.1W/1%'
+
+    library.regenerate()
+    library.regenerate(incremental=True)
+    assert len(registry) == 2
+
+    # Only the series whose content changed are registered again.
+    genpath = _write_series_generator(fpath, PRECISION[:4])
+    stat = os.stat(genpath)
+    os.utime(genpath, (stat.st_atime, stat.st_mtime + 60))
+    library.regenerate(incremental=True)
+    assert registry[2:] == ['TESTPRECISION']
+    assert conventions.custom_series['TESTCOMPOSITE'] is composite
+
+
+def test_generator_composite_series(tmpdir, registry):
+    genpath = _write_series_generator(
+        os.path.join(str(tmpdir), 'rgen.sym'), PRECISION[:3]
+    )
+    library = KVSymbolLibrary(str(tmpdir))
+    generator = library.generators[0].generator
+    assert generator.composite_series is \
+        conventions.custom_series['TESTCOMPOSITE']
+
+    # The series are built on first use of composite_series as well.
+    generator = type(generator)(genpath)
+    composite = generator.composite_series
+    assert composite.name == 'TESTCOMPOSITE'
+    assert composite in generator.iseries
+    assert len(generator.iseries) == 2
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Copyright (C) 2019 Chintalagiri Shashank
+#
+# This file is part of tendril.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import types
+import threading
+
+import pytest
+
+from tendril.entities.edasymbols import cache
+
+from .edasymbols import KVSymbolLibrary
+from .edasymbols import write_symbol
+from .edasymbols import write_generator
+
+
+class StubSourcing(object):
+    """
+    Stands in for the sourcing backend. Every lookup is recorded, and
+    quantities are made compliant by rounding them up to multiples of 5.
+    """
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def get_sourcing_information(self, ident, qty, allvendors=False):
+        with self._lock:
+            self.calls.append((ident, qty))
+        if ident in self.failing:
+            raise self.SourcingException(ident)
+        return ['{0} x {1}'.format(ident, qty)]
+
+    @staticmethod
+    def get_compliant_qty(ident, qty):
+        return -(-qty // 5) * 5
+
+    class SourcingException(Exception):
+        pass
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def sourcing(monkeypatch):
+    stub = StubSourcing()
+    electronics = types.ModuleType('tendril.sourcing.electronics')
+    electronics.get_sourcing_information = stub.get_sourcing_information
+    electronics.SourcingException = stub.SourcingException
+    guidelines = types.ModuleType('tendril.inventory.guidelines')
+    guidelines.electronics_qty = stub
+    for name in ('tendril.sourcing', 'tendril.inventory'):
+        if name not in sys.modules:
+            monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    monkeypatch.setitem(sys.modules, electronics.__name__, electronics)
+    monkeypatch.setitem(sys.modules, guidelines.__name__, guidelines)
+    return stub
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    rval = Clock()
+    monkeypatch.setattr(cache, 'time', rval)
+    return rval
+
+
+@pytest.fixture
+def library(tmpdir):
+    path = str(tmpdir)
+    for idx in range(3):
+        write_symbol(os.path.join(path, 'r{0}.sym'.format(idx)),
+                     'RES SMD', '1K', '0603')
+    write_symbol(os.path.join(path, 'c.sym'), 'CAP CER SMD', '100nF', '0603')
+    write_generator(os.path.join(path, 'rgen.sym'), 'RES SMD', '0805',
+                    'resistor', 'E6', '1K', '10K')
+    write_generator(os.path.join(path, 'rgen2.sym'), 'RES SMD', '0805',
+                    'resistor', 'E6', '1K', '10K')
+    return KVSymbolLibrary(path)
+
+
+def test_prefetch_one_lookup_per_ident(library, sourcing):
+    idents = set(x.ident for x in library.symbols)
+    assert len(idents) < len(library.symbols)
+    results = library.prefetch_sourcing(workers=4)
+    assert sorted(x[0] for x in sourcing.calls) == sorted(idents)
+    assert set(results.keys()) == idents
+
+    for symbol in library.symbols:
+        assert symbol.indicative_sourcing_info == results[symbol.ident]
+    assert len(sourcing.calls) == len(idents)
+
+
+def test_indicative_sourcing_info_from_cache(library, sourcing):
+    library.prefetch_sourcing(workers=2)
+    ncalls = len(sourcing.calls)
+    # New symbols, as after a regeneration, are served from the cache.
+    library.regenerate()
+    for symbol in library.symbols:
+        assert symbol.indicative_sourcing_info == \
+            ['{0} x 5'.format(symbol.ident)]
+    assert len(sourcing.calls) == ncalls
+
+
+def test_compliant_quantities_looked_up_once(library, sourcing):
+    symbol = library.symbols[0]
+    results = symbol.sourcing_info_qtys([1, 3, 5, 6, 10])
+    assert sourcing.calls == [(symbol.ident, 5), (symbol.ident, 10)]
+    assert results[:3] == [results[0]] * 3
+    assert results[3] == results[4] == ['{0} x 10'.format(symbol.ident)]
+    assert symbol.sourcing_info_qty(2) == results[0]
+    assert len(sourcing.calls) == 2
+
+
+def test_failures_not_cached(library, sourcing):
+    symbol = library.symbols[0]
+    sourcing.failing.add(symbol.ident)
+    assert symbol.sourcing_info_qty(1) == []
+    sourcing.failing.clear()
+    assert symbol.sourcing_info_qty(1) == ['{0} x 5'.format(symbol.ident)]
+    assert len(sourcing.calls) == 2
+
+
+def test_ttl_expiry(library, sourcing, clock, monkeypatch):
+    monkeypatch.setattr(cache, '_sourcing_cache',
+                        cache.EDASourcingCache(ttl=60, max_size=16))
+    symbol = library.symbols[0]
+    symbol.sourcing_info_qty(1)
+    clock.now += 59
+    symbol.sourcing_info_qty(1)
+    assert len(sourcing.calls) == 1
+    clock.now += 2
+    symbol.sourcing_info_qty(1)
+    assert len(sourcing.calls) == 2
+
+
+def test_lru_eviction(clock):
+    sourcing_cache = cache.EDASourcingCache(ttl=60, max_size=2)
+    sourcing_cache.put('a', 1)
+    sourcing_cache.put('b', 2)
+    assert sourcing_cache.get('a') == 1
+    sourcing_cache.put('c', 3)
+    assert sourcing_cache.get('b') is None
+    assert sourcing_cache.get('a') == 1
+    assert sourcing_cache.get('c') == 3
+    sourcing_cache.put('d', 4)
+    assert sourcing_cache.get('a') is None
+    sourcing_cache.clear()
+    assert sourcing_cache.get('c') is None